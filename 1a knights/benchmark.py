@@ -0,0 +1,159 @@
+import time
+
+from generator import generate_puzzle
+from logic import *
+from puzzle import (
+    AKnight, AKnave, BKnight, BKnave, CKnight, CKnave,
+    knowledge0, knowledge1, knowledge2, knowledge3, Xor
+)
+
+REPEATS = 50
+PARALLEL_PEOPLE = 9
+WORKER_COUNTS = [1, 2, 4, 8]
+
+SCALING_SIZES = [2, 4, 6, 8, 16, 32, 48]
+STATEMENTS_PER_PERSON = 1
+ENUMERATION_LIMIT = 14  # most symbols for engines that enumerate models
+
+SYMBOLS = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
+PUZZLES = [
+    ("Puzzle 0", knowledge0),
+    ("Puzzle 1", knowledge1),
+    ("Puzzle 2", knowledge2),
+    ("Puzzle 3", knowledge3)
+]
+
+
+def timed(function, repeats=REPEATS):
+    """
+    Call `function` `repeats` times.
+    Return its last result and the mean time per call in seconds.
+    """
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def one_query_at_a_time(knowledge, queries):
+    return {query: model_check(knowledge, query) for query in queries}
+
+
+def all_queries_at_once(knowledge, queries):
+    results = model_check_all(knowledge, queries)
+    return {query: results[query] == ENTAILED for query in queries}
+
+
+def main():
+    print("Entailment of all six symbols, mean time per puzzle")
+    for puzzle, knowledge in PUZZLES:
+        expected, t_single = timed(
+            lambda: one_query_at_a_time(knowledge, SYMBOLS))
+        result, t_multi = timed(
+            lambda: all_queries_at_once(knowledge, SYMBOLS))
+        assert result == expected, f"{puzzle}: results differ"
+        print(f"  {puzzle}: model_check {t_single * 1000:.3f} ms, "
+              f"model_check_all {t_multi * 1000:.3f} ms "
+              f"({t_single / t_multi:.1f}x)")
+    print()
+    parallel()
+    print()
+    scaling()
+
+
+def parallel():
+    # every inhabitant is either a knight or a knave; the query is entailed,
+    # so every model has to be checked
+    people = [
+        (Symbol(f"{n} is a Knight"), Symbol(f"{n} is a Knave"))
+        for n in range(PARALLEL_PEOPLE)
+    ]
+    knowledge = And(*[Xor(knight, knave) for knight, knave in people])
+    query = Or(*people[0])
+    symbols = len(knowledge.symbols())
+
+    print(f"Parallel model_check, {symbols} symbols ({2 ** symbols} models)")
+    for processes in WORKER_COUNTS:
+        stats = dict()
+        assert parallel_model_check(knowledge, query, processes, stats=stats)
+        print(f"  {processes} workers: {stats['models'] / stats['seconds']:,.0f}"
+              f" models/s in {stats['seconds']:.2f} s")
+        for pid, (models, seconds) in sorted(stats["workers"].items()):
+            print(f"    worker {pid}: {models / seconds:,.0f} models/s")
+
+    # a counter-model stops every worker early
+    stats = dict()
+    assert not parallel_model_check(knowledge, people[0][0], max(WORKER_COUNTS),
+                                    stats=stats)
+    print(f"  counter-model found after {stats['models']:,} models "
+          f"in {stats['seconds']:.2f} s")
+
+
+def engine_model_check(knowledge, queries):
+    results = dict()
+    for query in queries:
+        results[query] = (ENTAILED if model_check(knowledge, query) else
+                          REFUTED if model_check(knowledge, Not(query)) else
+                          UNKNOWN)
+    return results
+
+
+def engine_parallel(knowledge, queries):
+    results = dict()
+    for query in queries:
+        results[query] = (
+            ENTAILED if parallel_model_check(knowledge, query) else
+            REFUTED if parallel_model_check(knowledge, Not(query)) else
+            UNKNOWN
+        )
+    return results
+
+
+def engine_knowledge_base(knowledge, queries):
+    kb = KnowledgeBase(*knowledge.conjuncts)
+    return {query: kb.check(query) for query in queries}
+
+
+def engine_probability(knowledge, queries):
+    results = dict()
+    for query, p in probabilities(knowledge, queries).items():
+        results[query] = (ENTAILED if p == 1 else
+                          REFUTED if p == 0 else
+                          UNKNOWN)
+    return results
+
+
+ENGINES = [
+    ("model_check", engine_model_check, True),
+    ("model_check_all", model_check_all, True),
+    ("parallel_model_check", engine_parallel, True),
+    ("KnowledgeBase", engine_knowledge_base, False),
+    ("probabilities", engine_probability, False)
+]
+
+
+def scaling():
+    print("Generated puzzles, time to classify every symbol")
+    for n in SCALING_SIZES:
+        people, knowledge, solution = generate_puzzle(
+            n, STATEMENTS_PER_PERSON * n, seed=n)
+        queries = [symbol for pair in people for symbol in pair]
+        symbols = len(knowledge.symbols())
+        print(f"  {n} inhabitants, {symbols} symbols, "
+              f"{len(knowledge.conjuncts)} sentences")
+
+        expected = {
+            query: ENTAILED if solution[query.name] else REFUTED
+            for query in queries
+        }
+        for name, engine, enumerates in ENGINES:
+            if enumerates and symbols > ENUMERATION_LIMIT:
+                continue
+            results, seconds = timed(
+                lambda: engine(knowledge, queries), repeats=1)
+            assert results == expected, f"{name} disagrees for n = {n}"
+            print(f"    {name}: {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import random
+import sys
+
+from logic import *
+from puzzle import Xor
+
+
+def inhabitant_symbols(n):
+    """
+    Return a list of (knight, knave) symbol pairs for `n` inhabitants,
+    named A, B, ..., Z, then A1, B1, and so on.
+    """
+    people = []
+    for i in range(n):
+        name = chr(ord("A") + i % 26) + (str(i // 26) if i >= 26 else "")
+        people.append((
+            Symbol(f"{name} is a Knight"),
+            Symbol(f"{name} is a Knave")
+        ))
+    return people
+
+
+def random_claim(people, rng):
+    """
+    Return the logical content of a random statement about the inhabitants,
+    such as "B is a knave", "C and D are the same kind", or
+    "at least one of E and F is a knight".
+    """
+    kind = rng.randrange(4)
+    if kind == 0:
+        knight, knave = rng.choice(people)
+        return rng.choice([knight, knave])
+    (x_knight, x_knave), (y_knight, y_knave) = rng.sample(people, 2)
+    if kind == 1:
+        # "X and Y are the same kind"
+        return Or(And(x_knight, y_knight), And(x_knave, y_knave))
+    if kind == 2:
+        # "X and Y are of different kinds"
+        return Or(And(x_knight, y_knave), And(x_knave, y_knight))
+    # "at least one of X and Y is a knight"
+    return Or(x_knight, y_knight)
+
+
+def generate_puzzle(n, m, seed=None):
+    """
+    Generate a solvable knights-and-knaves puzzle with `n` inhabitants and
+    at least `m` statements.
+
+    A hidden solution decides who is a knight. Each statement is a random
+    claim made by a random inhabitant, chosen so that a knight's claim is
+    true and a knave's claim is false under the hidden solution. If `m`
+    statements do not yet pin down the solution, statements are added
+    until they do.
+
+    Return a tuple (people, knowledge, solution), where `people` is the
+    list of (knight, knave) symbol pairs, `knowledge` is the knowledge base
+    and `solution` maps each symbol name to its truth value.
+    """
+    if n < 2:
+        raise ValueError("a puzzle needs at least two inhabitants")
+    rng = random.Random(seed)
+    people = inhabitant_symbols(n)
+    solution = dict()
+    for knight, knave in people:
+        is_knight = rng.random() < 0.5
+        solution[knight.name] = is_knight
+        solution[knave.name] = not is_knight
+
+    # context: each inhabitant is either a knight or a knave
+    sentences = [Xor(knight, knave) for knight, knave in people]
+    kb = KnowledgeBase(*sentences)
+
+    statements = 0
+    while True:
+        if statements >= m:
+            unique = all(
+                kb.check(knight) != UNKNOWN for knight, _ in people
+            )
+            if unique:
+                break
+
+        # context: knight speaks truth, knave speaks lies
+        knight, knave = rng.choice(people)
+        claim = random_claim(people, rng)
+        if claim.evaluate(solution) != solution[knight.name]:
+            claim = Not(claim)
+        for sentence in [Implication(knight, claim),
+                         Implication(knave, Not(claim))]:
+            sentences.append(sentence)
+            kb.add(sentence)
+        statements += 1
+
+    return people, And(*sentences), solution
+
+
+def main():
+    if len(sys.argv) not in [3, 4]:
+        sys.exit("Usage: python generator.py inhabitants statements [seed]")
+    n, m = int(sys.argv[1]), int(sys.argv[2])
+    seed = int(sys.argv[3]) if len(sys.argv) == 4 else None
+    people, knowledge, solution = generate_puzzle(n, m, seed)
+    for sentence in knowledge.conjuncts:
+        print(sentence.formula())
+    print()
+    for knight, knave in people:
+        print(f"    {knight if solution[knight.name] else knave}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,72 @@
 import itertools
+import math
+import multiprocessing
+import os
+import time
+import weakref
 
 
 class Sentence():
+    """
+    Base class for logical sentences.
+
+    Sentences are hash-consed: constructing a sentence that is structurally
+    identical to one that already exists returns the existing object, so
+    equal sentences are the same object and can be compared by identity.
+    Every node is immutable and caches its hash and its set of symbols.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+    _tag = "sentence"
+
+    # table of every live sentence, keyed by (class, arguments)
+    _table = weakref.WeakValueDictionary()
+
+    def __new__(cls, *args):
+        key = (cls, args)
+        try:
+            return Sentence._table[key]
+        except KeyError:
+            pass
+        for arg in cls._operands(args):
+            Sentence.validate(arg)
+        self = object.__new__(cls)
+        self._setup(*args)
+        self._hash = hash((cls._tag, args))
+        self._symbols = self._collect_symbols()
+        Sentence._table[key] = self
+        return self
+
+    def __reduce__(self):
+        # rebuild through __new__ so unpickled sentences are interned too
+        return (type(self), self._args())
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "_symbols"):
+            raise AttributeError("sentences are immutable")
+        object.__setattr__(self, name, value)
+
+    @classmethod
+    def _operands(cls, args):
+        """Returns the arguments that must be logical sentences."""
+        return args
+
+    def _args(self):
+        """Returns the arguments the sentence was constructed with."""
+        return ()
+
+    def _setup(self, *args):
+        """Initializes the fields of a newly created sentence."""
+        pass
+
+    def _collect_symbols(self):
+        return frozenset()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,8 +77,8 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return self._symbols
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +108,24 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+    _tag = "symbol"
 
-    def __init__(self, name):
-        self.name = name
+    def __new__(cls, name):
+        return super().__new__(cls, name)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    @classmethod
+    def _operands(cls, args):
+        return ()
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def _args(self):
+        return (self.name,)
+
+    def _setup(self, name):
+        self.name = name
+
+    def _collect_symbols(self):
+        return frozenset((self.name,))
 
     def __repr__(self):
         return self.name
@@ -65,20 +139,22 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    __slots__ = ("operand",)
+    _tag = "not"
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def __new__(cls, operand):
+        return super().__new__(cls, operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def _args(self):
+        return (self.operand,)
+
+    def _setup(self, operand):
+        self.operand = operand
+
+    def _collect_symbols(self):
+        return self.operand.symbols()
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,22 +165,20 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
+    __slots__ = ("conjuncts",)
+    _tag = "and"
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    def _args(self):
+        return self.conjuncts
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+    def _setup(self, *conjuncts):
+        self.conjuncts = conjuncts
+
+    def _collect_symbols(self):
+        return frozenset().union(
+            *[conjunct.symbols() for conjunct in self.conjuncts]
         )
 
     def __repr__(self):
@@ -114,8 +188,11 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        """
+        Returns the conjunction of this sentence's conjuncts and `conjunct`.
+        Sentences are immutable, so the original sentence is unchanged.
+        """
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,22 +203,20 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
+    __slots__ = ("disjuncts",)
+    _tag = "or"
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    def _args(self):
+        return self.disjuncts
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def _setup(self, *disjuncts):
+        self.disjuncts = disjuncts
+
+    def _collect_symbols(self):
+        return frozenset().union(
+            *[disjunct.symbols() for disjunct in self.disjuncts]
         )
 
     def __repr__(self):
@@ -157,24 +232,23 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
+    __slots__ = ("antecedent", "consequent")
+    _tag = "implies"
+
+    def __new__(cls, antecedent, consequent):
+        return super().__new__(cls, antecedent, consequent)
+
+    def _args(self):
+        return (self.antecedent, self.consequent)
+
+    def _setup(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
-
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def _collect_symbols(self):
+        return self.antecedent.symbols() | self.consequent.symbols()
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,24 +262,23 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
+    __slots__ = ("left", "right")
+    _tag = "biconditional"
+
+    def __new__(cls, left, right):
+        return super().__new__(cls, left, right)
+
+    def _args(self):
+        return (self.left, self.right)
+
+    def _setup(self, left, right):
         self.left = left
         self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
-
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def _collect_symbols(self):
+        return self.left.symbols() | self.right.symbols()
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -221,12 +294,15 @@ class Biconditional(Sentence):
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+def model_check(knowledge, query, processes=None):
+    """
+    Checks if knowledge base entails query.
+    If `processes` is given, the models are checked in parallel by that
+    many worker processes (see parallel_model_check).
+    """
+    if processes is not None:
+        return parallel_model_check(knowledge, query, processes)
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +333,712 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+# state shared by the worker processes of parallel_model_check
+_worker = dict()
+
+
+def _init_worker(stop, knowledge, query):
+    _worker["stop"] = stop
+    _worker["knowledge"] = knowledge
+    _worker["query"] = query
+
+
+def _check_subcube(task):
+    """
+    Checks every model extending the assignment `fixed` to the `free`
+    symbols. Returns whether entailment held, the number of models
+    checked, the time taken and the id of the worker process.
+    """
+    fixed, free = task
+    knowledge = _worker["knowledge"]
+    query = _worker["query"]
+    stop = _worker["stop"]
+    start = time.perf_counter()
+    model = dict(fixed)
+    checked = 0
+    holds = True
+    for values in itertools.product((True, False), repeat=len(free)):
+
+        # another worker has already found a counter-model
+        if checked % 1024 == 0 and stop.is_set():
+            break
+        model.update(zip(free, values))
+        checked += 1
+        if knowledge.evaluate(model) and not query.evaluate(model):
+            stop.set()
+            holds = False
+            break
+    return holds, checked, time.perf_counter() - start, os.getpid()
+
+
+def parallel_model_check(knowledge, query, processes=None, prefix=None,
+                         stats=None):
+    """
+    Checks if knowledge base entails query, enumerating models in parallel.
+
+    The assignments to the first `prefix` symbols split the models into
+    subcubes, which are checked by a pool of `processes` workers. As soon
+    as any worker finds a model of the knowledge in which the query is
+    false, every worker is stopped.
+
+    If `stats` is a dictionary, it is filled with the number of models
+    checked, the elapsed time, and per-worker model counts and times.
+    """
+    processes = processes or os.cpu_count()
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    if prefix is None:
+        # a few subcubes per worker, to even out the load
+        prefix = math.ceil(math.log2(processes * 4))
+    prefix = min(prefix, len(symbols))
+    fixed, free = symbols[:prefix], symbols[prefix:]
+    tasks = [
+        (tuple(zip(fixed, values)), free)
+        for values in itertools.product((True, False), repeat=prefix)
+    ]
+
+    start = time.perf_counter()
+    workers = dict()
+    entailed = True
+    stop = multiprocessing.Event()
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(stop, knowledge, query)) as pool:
+        for holds, checked, seconds, pid in pool.imap_unordered(
+                _check_subcube, tasks):
+            models, busy = workers.get(pid, (0, 0.0))
+            workers[pid] = (models + checked, busy + seconds)
+            if not holds:
+                entailed = False
+                break
+        pool.terminate()
+
+    if stats is not None:
+        stats["models"] = sum(models for models, _ in workers.values())
+        stats["seconds"] = time.perf_counter() - start
+        stats["workers"] = workers
+    return entailed
+
+
+ENTAILED = "entailed"
+REFUTED = "refuted"
+UNKNOWN = "unknown"
+
+
+class ModelChecker():
+    """
+    Answers many entailment queries against one knowledge base.
+
+    The models of the knowledge base are enumerated once, on the first
+    query, and kept for every later query.
+    """
+
+    def __init__(self, knowledge):
+        Sentence.validate(knowledge)
+        self.knowledge = knowledge
+        self.symbols = sorted(knowledge.symbols())
+        self.models = None
+
+    def enumerate_models(self):
+        """Returns a list of every model in which the knowledge is true."""
+        if self.models is None:
+            self.models = []
+            for values in itertools.product((True, False),
+                                            repeat=len(self.symbols)):
+                model = dict(zip(self.symbols, values))
+                if self.knowledge.evaluate(model):
+                    self.models.append(model)
+        return self.models
+
+    def extended_models(self, query):
+        """
+        Yields every model of the knowledge, extended with each possible
+        assignment of the query's symbols that the knowledge does not use.
+        """
+        extra = sorted(query.symbols() - self.knowledge.symbols())
+        for model in self.enumerate_models():
+            if not extra:
+                yield model
+                continue
+            for values in itertools.product((True, False), repeat=len(extra)):
+                extended = model.copy()
+                extended.update(zip(extra, values))
+                yield extended
+
+    def check(self, query):
+        """
+        Returns ENTAILED if the knowledge entails `query`, REFUTED if it
+        entails the negation of `query`, and UNKNOWN otherwise.
+        """
+        Sentence.validate(query)
+        holds = False
+        fails = False
+        for model in self.extended_models(query):
+            if query.evaluate(model):
+                holds = True
+            else:
+                fails = True
+            if holds and fails:
+                return UNKNOWN
+        if fails:
+            return REFUTED
+        # includes a knowledge base with no models, which entails everything
+        return ENTAILED
+
+    def check_all(self, queries):
+        """Returns a dictionary mapping each query to the result of check."""
+        return {query: self.check(query) for query in queries}
+
+
+def model_check_all(knowledge, queries):
+    """
+    Checks a list of queries against one knowledge base, enumerating its
+    models only once. Returns a dictionary mapping each query to
+    ENTAILED, REFUTED or UNKNOWN.
+    """
+    return ModelChecker(knowledge).check_all(queries)
+
+
+class Solver():
+    """
+    Incremental CDCL satisfiability solver over clauses of integer literals.
+
+    Variables are numbered from 1; a literal is a variable number, negated
+    for the false polarity. Clauses and learned clauses are kept across
+    calls to solve, and each call may pass assumptions: literals that
+    hold for that call only.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+        self.learned = []
+        self.watches = {}
+
+        # indexed by variable; index 0 is unused
+        self.assigns = [None]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.polarity = [False]
+        self.bump = 1.0
+
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.inconsistent = False
+        self.model = None
+
+    def new_var(self):
+        """Adds a new variable and returns its number."""
+        self.num_vars += 1
+        var = self.num_vars
+        self.assigns.append(None)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.polarity.append(False)
+        self.watches[var] = []
+        self.watches[-var] = []
+        return var
+
+    def value(self, lit):
+        """Returns True, False or None for an unassigned literal."""
+        value = self.assigns[abs(lit)]
+        if value is None:
+            return None
+        return value if lit > 0 else not value
+
+    def decision_level(self):
+        return len(self.trail_lim)
+
+    def enqueue(self, lit, reason):
+        var = abs(lit)
+        self.assigns[var] = lit > 0
+        self.levels[var] = self.decision_level()
+        self.reasons[var] = reason
+        self.trail.append(lit)
+
+    def backtrack(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        if self.decision_level() <= level:
+            return
+        for lit in self.trail[self.trail_lim[level]:]:
+            var = abs(lit)
+            self.polarity[var] = lit > 0
+            self.assigns[var] = None
+            self.reasons[var] = None
+        del self.trail[self.trail_lim[level]:]
+        del self.trail_lim[level:]
+        self.qhead = len(self.trail)
+
+    def add_clause(self, lits):
+        """
+        Adds a clause to the solver.
+        Returns False if the clauses have become unsatisfiable.
+        """
+        if self.inconsistent:
+            return False
+        self.backtrack(0)
+        clause = []
+        for lit in lits:
+            value = self.value(lit)
+            if value is True or -lit in clause:
+                # satisfied at the top level, or a tautology
+                return True
+            if value is None and lit not in clause:
+                clause.append(lit)
+
+        if len(clause) == 0:
+            self.inconsistent = True
+        elif len(clause) == 1:
+            self.enqueue(clause[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.clauses.append(clause)
+            self.watches[clause[0]].append(clause)
+            self.watches[clause[1]].append(clause)
+        return not self.inconsistent
+
+    def propagate(self):
+        """
+        Performs unit propagation over the watched literals.
+        Returns a conflicting clause, or None if there is no conflict.
+        """
+        watches = self.watches
+        value = self.value
+        while self.qhead < len(self.trail):
+            false_lit = -self.trail[self.qhead]
+            self.qhead += 1
+            watching = watches[false_lit]
+            kept = []
+            i = 0
+            while i < len(watching):
+                clause = watching[i]
+                i += 1
+
+                # make sure the false literal is clause[1]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+
+                # look for a new literal to watch
+                for k in range(2, len(clause)):
+                    if value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        watches[clause[1]].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value(clause[0]) is False:
+                        kept.extend(watching[i:])
+                        watches[false_lit] = kept
+                        return clause
+                    self.enqueue(clause[0], clause)
+            watches[false_lit] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derives a learned clause from a conflict (first unique implication
+        point). Returns the clause and the level to backtrack to.
+        """
+        level = self.decision_level()
+        learned = [None]
+        seen = set()
+        pending = 0
+        lit = None
+        clause = conflict
+        index = len(self.trail) - 1
+        while True:
+            for q in (clause if lit is None else clause[1:]):
+                var = abs(q)
+                if var not in seen and self.levels[var] > 0:
+                    seen.add(var)
+                    self.activity[var] += self.bump
+                    if self.levels[var] == level:
+                        pending += 1
+                    else:
+                        learned.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            clause = self.reasons[abs(lit)]
+            seen.discard(abs(lit))
+            pending -= 1
+            if pending == 0:
+                break
+        learned[0] = -lit
+
+        if len(learned) == 1:
+            return learned, 0
+        # watch the literal from the highest remaining level second
+        best = max(range(1, len(learned)),
+                   key=lambda k: self.levels[abs(learned[k])])
+        learned[1], learned[best] = learned[best], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def pick_branch(self):
+        """Returns the unassigned variable with the highest activity."""
+        best = None
+        best_activity = -1.0
+        for var in range(1, self.num_vars + 1):
+            if (self.assigns[var] is None
+                    and self.activity[var] > best_activity):
+                best = var
+                best_activity = self.activity[var]
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, storing a satisfying assignment in self.model.
+        """
+        self.model = None
+        if self.inconsistent:
+            return False
+        self.backtrack(0)
+        assumptions = list(assumptions)
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if self.decision_level() == 0:
+                    self.inconsistent = True
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.watches[learned[0]].append(learned)
+                    self.watches[learned[1]].append(learned)
+                    self.enqueue(learned[0], learned)
+                self.bump *= 1.05
+                continue
+
+            if self.decision_level() < len(assumptions):
+                lit = assumptions[self.decision_level()]
+                value = self.value(lit)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    self.enqueue(lit, None)
+                continue
+
+            var = self.pick_branch()
+            if var is None:
+                self.model = self.assigns.copy()
+                self.backtrack(0)
+                return True
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(var if self.polarity[var] else -var, None)
+
+
+class ClauseCompiler():
+    """
+    Compiles sentences to clauses of integer literals, with one variable
+    per distinct subformula, each defined to be equivalent to it. Every
+    variable is determined by the symbols, so the clauses have exactly as
+    many models as the sentences they were compiled from.
+    """
+
+    def __init__(self):
+        self.num_vars = 0
+        self.clauses = []
+        self.literals = dict()
+        self.symbol_vars = dict()
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def compile(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is true,
+        adding the clauses that define it to self.clauses.
+        """
+        try:
+            return self.literals[sentence]
+        except KeyError:
+            pass
+        clauses = self.clauses
+
+        if isinstance(sentence, Symbol):
+            lit = self.new_var()
+            self.symbol_vars[sentence.name] = lit
+
+        elif isinstance(sentence, Not):
+            lit = -self.compile(sentence.operand)
+
+        elif isinstance(sentence, (And, Or)):
+            # an Or is the negation of the And of its negated disjuncts
+            sign = 1 if isinstance(sentence, And) else -1
+            parts = (sentence.conjuncts if sign == 1
+                     else sentence.disjuncts)
+            operands = [sign * self.compile(part) for part in parts]
+            var = self.new_var()
+            for operand in operands:
+                clauses.append([-var, operand])
+            clauses.append([var] + [-operand for operand in operands])
+            lit = sign * var
+
+        elif isinstance(sentence, Implication):
+            a = self.compile(sentence.antecedent)
+            c = self.compile(sentence.consequent)
+            lit = self.new_var()
+            clauses.append([-lit, -a, c])
+            clauses.append([lit, a])
+            clauses.append([lit, -c])
+
+        elif isinstance(sentence, Biconditional):
+            a = self.compile(sentence.left)
+            b = self.compile(sentence.right)
+            lit = self.new_var()
+            clauses.append([-lit, -a, b])
+            clauses.append([-lit, a, -b])
+            clauses.append([lit, a, b])
+            clauses.append([lit, -a, -b])
+
+        else:
+            raise TypeError(f"cannot compile {type(sentence).__name__}")
+
+        self.literals[sentence] = lit
+        return lit
+
+
+class KnowledgeBase():
+    """
+    Knowledge base that can be added to one sentence at a time.
+
+    Sentences are compiled to clauses (one variable per distinct
+    subformula) as they are added, and the clauses, learned clauses and
+    top-level assignments stay in the solver between queries. Queries may
+    be made under assumptions, which hold for that query only.
+    """
+
+    def __init__(self, *sentences):
+        self.solver = Solver()
+        self.compiler = ClauseCompiler()
+        self.symbol_vars = self.compiler.symbol_vars
+        self.sentences = []
+        for sentence in sentences:
+            self.add(sentence)
+
+    def compile(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is true,
+        passing any new defining clauses on to the solver.
+        """
+        compiled = len(self.compiler.clauses)
+        lit = self.compiler.compile(sentence)
+        while self.solver.num_vars < self.compiler.num_vars:
+            self.solver.new_var()
+        for clause in self.compiler.clauses[compiled:]:
+            self.solver.add_clause(clause)
+        return lit
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.solver.add_clause([self.compile(sentence)])
+
+    def satisfiable(self, assumptions=()):
+        """
+        Returns True if the knowledge, together with every sentence in
+        `assumptions`, can be true.
+        """
+        lits = [self.compile(assumption) for assumption in assumptions]
+        return self.solver.solve(lits)
+
+    def entails(self, query, assumptions=()):
+        """Checks if knowledge, under `assumptions`, entails query."""
+        return not self.satisfiable([*assumptions, Not(query)])
+
+    def check(self, query, assumptions=()):
+        """
+        Returns ENTAILED if the knowledge (under `assumptions`) entails
+        `query`, REFUTED if it entails the negation of `query`, and
+        UNKNOWN otherwise.
+        """
+        if self.entails(query, assumptions):
+            return ENTAILED
+        if self.entails(Not(query), assumptions):
+            return REFUTED
+        return UNKNOWN
+
+    def model(self, assumptions=()):
+        """
+        Returns a dictionary mapping each symbol to a truth value in which
+        the knowledge is true, or None if there is no such model.
+        """
+        if not self.satisfiable(assumptions):
+            return None
+        return {
+            name: self.solver.model[var]
+            for name, var in self.symbol_vars.items()
+        }
+
+
+class ModelCounter():
+    """
+    Counts the models of a set of clauses (#SAT).
+
+    Clauses that share no variables are split into independent components,
+    whose counts multiply, and the count of every component is cached so
+    that sub-formulas met again on other branches are counted only once.
+    """
+
+    def __init__(self):
+        self.cache = dict()
+
+    def count(self, clauses, variables):
+        """
+        Returns the number of assignments to `variables` (a set of variable
+        numbers, containing every variable in the clauses) that satisfy
+        every clause.
+        """
+        result = self.propagate(clauses)
+        if result is None:
+            return 0
+        clauses, assigned = result
+
+        # variables left in no clause can take either value
+        used = {abs(lit) for clause in clauses for lit in clause}
+        total = 2 ** (len(variables) - len(assigned) - len(used))
+        for component in self.components(clauses):
+            total *= self.count_component(component)
+            if total == 0:
+                break
+        return total
+
+    def count_component(self, component):
+        """Returns the number of models of a connected set of clauses."""
+        try:
+            return self.cache[component]
+        except KeyError:
+            pass
+
+        # branch on the variable that occurs most often
+        occurrences = dict()
+        for clause in component:
+            for lit in clause:
+                occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+        var = max(occurrences, key=occurrences.get)
+        variables = set(occurrences)
+        total = (self.count(component | {frozenset((var,))}, variables) +
+                 self.count(component | {frozenset((-var,))}, variables))
+
+        self.cache[component] = total
+        return total
+
+    @staticmethod
+    def propagate(clauses):
+        """
+        Applies unit propagation. Returns the simplified clauses and the set
+        of assigned variables, or None if a clause cannot be satisfied.
+        """
+        clauses = set(clauses)
+        assigned = set()
+        units = [clause for clause in clauses if len(clause) == 1]
+        while units:
+            (lit,) = units.pop()
+            if abs(lit) in assigned:
+                if frozenset((-lit,)) in clauses:
+                    return None
+                continue
+            assigned.add(abs(lit))
+            simplified = set()
+            for clause in clauses:
+                if lit in clause:
+                    continue
+                if -lit in clause:
+                    clause = clause - {-lit}
+                    if not clause:
+                        return None
+                    if len(clause) == 1:
+                        units.append(clause)
+                simplified.add(clause)
+            clauses = simplified
+        return clauses, assigned
+
+    @staticmethod
+    def components(clauses):
+        """Splits clauses into groups that share no variables."""
+        parent = dict()
+
+        def find(var):
+            while parent.setdefault(var, var) != var:
+                parent[var] = parent[parent[var]]
+                var = parent[var]
+            return var
+
+        for clause in clauses:
+            first = find(abs(next(iter(clause))))
+            for lit in clause:
+                parent[find(abs(lit))] = first
+
+        groups = dict()
+        for clause in clauses:
+            root = find(abs(next(iter(clause))))
+            groups.setdefault(root, set()).add(clause)
+        return [frozenset(group) for group in groups.values()]
+
+
+def count_models(knowledge, query=None):
+    """
+    Returns the number of models, over every symbol in the knowledge base
+    and the query, in which the knowledge base (and the query, if given)
+    is true.
+    """
+    sentences = [knowledge] if query is None else [knowledge, query]
+    compiler = ClauseCompiler()
+    lits = [compiler.compile(sentence) for sentence in sentences]
+    clauses = [frozenset(clause) for clause in compiler.clauses]
+    clauses += [frozenset((lit,)) for lit in lits]
+    variables = set(range(1, compiler.num_vars + 1))
+    return ModelCounter().count(clauses, variables)
+
+
+def probability(knowledge, query):
+    """
+    Returns the probability that query is true given the knowledge base,
+    when every model of the knowledge base is equally likely.
+    """
+    return probabilities(knowledge, [query])[query]
+
+
+def probabilities(knowledge, queries):
+    """
+    Returns a dictionary mapping each query to its probability given the
+    knowledge base, when every model of the knowledge base is equally
+    likely. The knowledge base is compiled and counted only once.
+    """
+    compiler = ClauseCompiler()
+    k = compiler.compile(knowledge)
+    lits = {query: compiler.compile(query) for query in queries}
+    clauses = [frozenset(clause) for clause in compiler.clauses]
+    clauses.append(frozenset((k,)))
+    variables = set(range(1, compiler.num_vars + 1))
+
+    # one counter, so that components shared by the counts are cached
+    counter = ModelCounter()
+    total = counter.count(clauses, variables)
+    if total == 0:
+        raise ValueError("knowledge base has no models")
+    return {
+        query: counter.count(clauses + [frozenset((lit,))], variables) / total
+        for query, lit in lits.items()
+    }
@@ -0,0 +1,172 @@
+import itertools
+import random
+import time
+import tracemalloc
+
+from minesweeper import Minesweeper, MinesweeperAI, Sentence
+
+# (height, width, mines)
+BOARDS = [
+    (16, 30, 99),
+    (100, 100, 1200)
+]
+GAMES = 3
+REPEATS = 20
+
+# (height, width, mines) for timing board generation alone
+LARGE_BOARD = (1000, 1000, 150000)
+
+
+def play(height, width, mines, seed):
+    """
+    Play one game with the AI, without a display.
+    Return the AI, and the time spent in add_knowledge.
+    """
+    game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+    ai = MinesweeperAI(height=height, width=width, seed=f"ai-{seed}")
+    elapsed = 0
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        nearby = game.nearby_mines(move)
+        start = time.perf_counter()
+        ai.add_knowledge(move, nearby)
+        elapsed += time.perf_counter() - start
+    return ai, elapsed
+
+
+def frontier_sentences(height, width, seed):
+    """
+    Return one sentence for every revealed cell's unknown neighbours,
+    as the AI would create them during a game.
+    """
+    random.seed(seed)
+    sentences = []
+    for i, j in itertools.product(range(height), range(width)):
+        cells = {
+            (x, y)
+            for x in range(i - 1, i + 2)
+            for y in range(j - 1, j + 2)
+            if 0 <= x < height and 0 <= y < width and (x, y) != (i, j)
+            and random.random() < 0.6
+        }
+        if cells:
+            sentences.append((cells, random.randint(0, len(cells))))
+    return sentences
+
+
+def overlapping_pairs(sentences):
+    """
+    Return every ordered pair of sentences that share a cell.
+    """
+    by_cell = dict()
+    for index, sentence in enumerate(sentences):
+        for cell in sentence.cells:
+            by_cell.setdefault(cell, []).append(index)
+    pairs = set()
+    for overlaps in by_cell.values():
+        pairs.update(itertools.permutations(overlaps, 2))
+    return sorted(pairs)
+
+
+def subset_round(sentences, pairs):
+    """
+    Run the work of one subset-inference round: for every pair of
+    sentences sharing a cell, test for a subset, take the difference,
+    and dedupe the results by hashing.
+    """
+    new_sentences = set()
+    for left, right in pairs:
+        left, right = sentences[left], sentences[right]
+        if left < right:
+            new_sentences.add(right - left)
+    return new_sentences
+
+
+class SetSentence():
+    """
+    Sentence with its cells in a frozenset, for comparison.
+    """
+
+    def __init__(self, cells, count):
+        self.cells = frozenset(cells)
+        self.count = count
+
+    def __eq__(self, other):
+        return self.cells == other.cells and self.count == other.count
+
+    def __hash__(self):
+        return hash((self.cells, self.count))
+
+    def __lt__(self, other):
+        return self.cells < other.cells
+
+    def __sub__(self, other):
+        return SetSentence(self.cells - other.cells, self.count - other.count)
+
+
+def allocated(function):
+    """
+    Return the result of `function` and the bytes it left allocated.
+    """
+    tracemalloc.start()
+    result = function()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    height, width, mines = LARGE_BOARD
+    start = time.perf_counter()
+    game = Minesweeper(height=height, width=width, mines=mines)
+    seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for i in range(height):
+        for j in range(width):
+            game.nearby_mines((i, j))
+    lookups = time.perf_counter() - start
+    print(f"{height}x{width} board, {mines} mines: generated in "
+          f"{seconds * 1000:.0f} ms, every nearby_mines lookup in "
+          f"{lookups * 1000:.0f} ms")
+
+    for height, width, mines in BOARDS:
+        print(f"{height}x{width} board, {mines} mines")
+
+        raw = frontier_sentences(height, width, seed=0)
+        as_sets, set_bytes = allocated(
+            lambda: [SetSentence(cells, count) for cells, count in raw])
+        as_bits, bit_bytes = allocated(
+            lambda: [Sentence(cells, count, width) for cells, count in raw])
+        print(f"  memory per sentence: set cells {set_bytes / len(raw):.0f} B,"
+              f" bitset cells {bit_bytes / len(raw):.0f} B")
+        pairs = overlapping_pairs(as_sets)
+        results = []
+        for name, sentences in [
+            ("set cells", as_sets),
+            ("bitset cells", as_bits)
+        ]:
+            start = time.perf_counter()
+            for _ in range(REPEATS):
+                found = subset_round(sentences, pairs)
+            seconds = (time.perf_counter() - start) / REPEATS
+            results.append(len(found))
+            print(f"  subset round over {len(pairs)} overlapping pairs, "
+                  f"{name}: {seconds * 1000:.1f} ms")
+        assert results[0] == results[1], "representations disagree"
+
+        moves = 0
+        total = 0
+        for seed in range(GAMES):
+            ai, elapsed = play(height, width, mines, seed)
+            moves += len(ai.moves_made)
+            total += elapsed
+        print(f"  add_knowledge: {moves} moves over {GAMES} games, "
+              f"{total / moves * 1000:.3f} ms per move")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,29 @@
 import itertools
+import json
 import random
+import time
+
+import numpy as np
+
+from probability import mine_probabilities
+
+
+def count_neighbours(board, height, width):
+    """
+    Returns a bytes object holding, for each cell of a row-major board of
+    mines (a bytes-like object of 0s and 1s), the number of mines in the
+    eight cells around it.
+    """
+    grid = np.frombuffer(board, dtype=np.uint8).reshape(height, width)
+
+    # Convolve with a 3x3 kernel of ones, then take away the cell itself
+    padded = np.pad(grid, 1)
+    counts = np.zeros((height, width), dtype=np.uint8)
+    for di in range(3):
+        for dj in range(3):
+            counts += padded[di:di + height, dj:dj + width]
+    counts -= grid
+    return counts.tobytes()
 
 
 class Minesweeper():
@@ -7,32 +31,44 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # Initialize an empty field with no mines,
+        # one byte per cell, in row-major order
+        self._grid = bytearray(height * width)
 
-        # Add mines randomly
-        while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
-            if not self.board[i][j]:
-                self.mines.add((i, j))
-                self.board[i][j] = True
+        # The same field as rows of booleans, so board[i][j] still works
+        self.board = np.frombuffer(self._grid, dtype=np.bool_).reshape(
+            height, width)
+
+        # Add mines randomly, sampling positions without replacement
+        positions = random.Random(seed).sample(range(height * width), mines)
+        for position in positions:
+            self._grid[position] = 1
+        self.mines = {divmod(position, width) for position in positions}
+
+        # Count every cell's neighbouring mines in one pass
+        self.counts = count_neighbours(self._grid, height, width)
 
         # At first, player has found no mines
         self.mines_found = set()
 
+    @classmethod
+    def from_mines(cls, height, width, mines):
+        """
+        Returns a game with mines on exactly the given cells.
+        """
+        game = cls(height=height, width=width, mines=0)
+        for i, j in mines:
+            game._grid[i * width + j] = 1
+        game.mines = set(mines)
+        game.counts = count_neighbours(game._grid, height, width)
+        return game
+
     def print(self):
         """
         Prints a text-based representation
@@ -41,7 +77,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self._grid[i * self.width + j]:
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -49,12 +85,8 @@ class Minesweeper():
         print("--" * self.width + "-")
 
     def is_mine(self, cell):
-        try:
-            i, j = cell
-        except Exception as ex:
-            print(cell)
-            raise ex
-        return self.board[i][j]
+        i, j = cell
+        return bool(self._grid[i * self.width + j])
 
     def nearby_mines(self, cell):
         """
@@ -62,24 +94,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
-
-        # Keep count of nearby mines
-        count = 0
-
-        # Loop over all cells within one row and column
-        for i in range(cell[0] - 1, cell[0] + 2):
-            for j in range(cell[1] - 1, cell[1] + 2):
-
-                # Ignore the cell itself
-                if (i, j) == cell:
-                    continue
-
-                # Update count if cell in bounds and is mine
-                if 0 <= i < self.height and 0 <= j < self.width:
-                    if self.board[i][j]:
-                        count += 1
-
-        return count
+        i, j = cell
+        return self.counts[i * self.width + j]
 
     def won(self):
         """
@@ -93,14 +109,113 @@ class Sentence():
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+
+    The cells are stored as bits of an integer: cell (i, j) on a board
+    `width` cells wide has the row-major index (i * width + j), and is
+    bit (index - offset), where offset is the lowest index in the
+    sentence. Keeping the offset out of the integer keeps it a few words
+    long on any board, so subset tests, differences and hashing are a
+    handful of small integer operations.
+
+    `width` defaults to the width of the default board. Cells outside a
+    board that wide raise a ValueError rather than being stored as some
+    other cell, so sentences on wider boards must be given their width.
     """
 
-    def __init__(self, cells, count):
-        self.cells = set(cells)
+    __slots__ = ("bits", "offset", "count", "width", "_hash")
+
+    def __init__(self, cells, count, width=8):
+        indices = []
+        for i, j in cells:
+            if i < 0 or not 0 <= j < width:
+                raise ValueError(
+                    f"cell {(i, j)} is not on a board {width} cells wide")
+            indices.append(i * width + j)
+        self.offset = min(indices, default=0)
+        bits = 0
+        for index in indices:
+            bits |= 1 << (index - self.offset)
+        self.bits = bits
         self.count = count
+        self.width = width
+        self._hash = None
+
+    @classmethod
+    def from_bits(cls, bits, offset, count, width):
+        """
+        Returns a sentence about the cells whose bits are set in `bits`,
+        bit k standing for the cell with row-major index (offset + k).
+        """
+        sentence = cls.__new__(cls)
+        if bits:
+            # make bit 0 the lowest cell
+            shift = (bits & -bits).bit_length() - 1
+            bits >>= shift
+            offset += shift
+        else:
+            offset = 0
+        sentence.bits = bits
+        sentence.offset = offset
+        sentence.count = count
+        sentence.width = width
+        sentence._hash = None
+        return sentence
+
+    @property
+    def cells(self):
+        """
+        The set of cells in the sentence, as (i, j) tuples.
+        """
+        cells = set()
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            cells.add(divmod(self.offset + low.bit_length() - 1, self.width))
+            bits ^= low
+        return cells
+
+    def __len__(self):
+        return self.bits.bit_count()
 
     def __eq__(self, other):
-        return self.cells == other.cells and self.count == other.count
+        return (self.bits == other.bits and self.offset == other.offset
+                and self.count == other.count)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash((self.bits, self.offset, self.count))
+        return self._hash
+
+    def __le__(self, other):
+        """
+        Checks if this sentence's cells are a subset of other's.
+        """
+        if self.offset < other.offset:
+            return self.bits == 0
+        bits = self.bits << (self.offset - other.offset)
+        return bits & other.bits == bits
+
+    def __lt__(self, other):
+        """
+        Checks if this sentence's cells are a proper subset of other's.
+        """
+        shift = self.offset - other.offset
+        if shift < 0:
+            return self.bits == 0 and other.bits != 0
+        bits = self.bits << shift
+        return bits & other.bits == bits and bits != other.bits
+
+    def __sub__(self, other):
+        """
+        Returns the sentence about the cells of this sentence that are
+        not in other, with other's count taken away (the subset method,
+        when other's cells are a subset of this sentence's cells).
+        """
+        shift = other.offset - self.offset
+        shared = (self.bits & (other.bits << shift) if shift >= 0 else
+                  self.bits & (other.bits >> -shift))
+        return Sentence.from_bits(self.bits ^ shared, self.offset,
+                                  self.count - other.count, self.width)
 
     def __str__(self):
         return f"{self.cells} = {self.count}"
@@ -109,7 +224,7 @@ class Sentence():
         """
         Returns the set of all cells in self.cells known to be mines.
         """
-        return self.cells if self.count == len(self.cells) else set()
+        return self.cells if self.count == len(self) else set()
 
     def known_safes(self):
         """
@@ -117,13 +232,31 @@ class Sentence():
         """
         return self.cells if self.count == 0 else set()
 
+    def remove(self, cell):
+        """
+        Removes a cell from the sentence.
+        Returns True if the cell was in the sentence.
+        """
+        k = cell[0] * self.width + cell[1] - self.offset
+        if k < 0 or not self.bits >> k & 1:
+            return False
+        bits = self.bits ^ (1 << k)
+        if bits:
+            shift = (bits & -bits).bit_length() - 1
+            self.bits = bits >> shift
+            self.offset += shift
+        else:
+            self.bits = 0
+            self.offset = 0
+        self._hash = None
+        return True
+
     def mark_mine(self, cell):
         """
         Updates internal knowledge representation given the fact that
         a cell is known to be a mine.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        if self.remove(cell):
             self.count -= 1
 
     def mark_safe(self, cell):
@@ -131,8 +264,110 @@ class Sentence():
         Updates internal knowledge representation given the fact that
         a cell is known to be safe.
         """
-        if cell in self.cells:
-            self.cells.remove(cell)
+        self.remove(cell)
+
+
+class Knowledge():
+    """
+    Collection of sentences known to be true, indexed by cell
+    so that the sentences about a given cell can be found directly.
+    """
+
+    def __init__(self):
+
+        # Sentences by id, in the order they were added
+        self.sentences = dict()
+
+        # For each cell, the sentences (by id) that contain it
+        self.cells = dict()
+
+    def __iter__(self):
+        # iterate over a copy, so sentences can be removed while iterating
+        return iter(list(self.sentences.values()))
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def __contains__(self, sentence):
+        return id(sentence) in self.sentences
+
+    def add(self, sentence):
+        """
+        Adds a sentence, and indexes it under each of its cells.
+        """
+        self.sentences[id(sentence)] = sentence
+        for cell in sentence.cells:
+            self.cells.setdefault(cell, dict())[id(sentence)] = sentence
+
+    def remove(self, sentence):
+        """
+        Removes a sentence, and its entries in the cell index.
+        """
+        del self.sentences[id(sentence)]
+        for cell in sentence.cells:
+            containing = self.cells[cell]
+            del containing[id(sentence)]
+            if len(containing) == 0:
+                del self.cells[cell]
+
+    def containing(self, cell):
+        """
+        Returns a list of the sentences that contain a cell.
+        """
+        return list(self.cells.get(cell, dict()).values())
+
+    def overlapping(self, sentence):
+        """
+        Returns a list of the other sentences that share a cell with a sentence.
+        """
+        overlaps = dict()
+        for cell in sentence.cells:
+            overlaps.update(self.cells[cell])
+        overlaps.pop(id(sentence), None)
+        return list(overlaps.values())
+
+    def has(self, sentence):
+        """
+        Checks if a sentence equal to the given one is known.
+        """
+        if sentence.bits == 0:
+            return False
+        cell = divmod(sentence.offset, sentence.width)
+        return any(other == sentence for other in self.containing(cell))
+
+    def mark_mine(self, cell):
+        """
+        Marks a cell as a mine in every sentence that contains it.
+        Returns a list of the sentences that changed.
+        """
+        changed = list(self.cells.pop(cell, dict()).values())
+        for sentence in changed:
+            sentence.mark_mine(cell)
+        return changed
+
+    def mark_safe(self, cell):
+        """
+        Marks a cell as safe in every sentence that contains it.
+        Returns a list of the sentences that changed.
+        """
+        changed = list(self.cells.pop(cell, dict()).values())
+        for sentence in changed:
+            sentence.mark_safe(cell)
+        return changed
+
+
+class Tracer():
+    """
+    Records what the AI does, as one JSON object per line:
+    an event name, and counters of the work done for it.
+    """
+
+    def __init__(self, file):
+        self.file = file
+
+    def emit(self, event, **fields):
+        fields = {"event": event, **fields}
+        self.file.write(json.dumps(fields) + "\n")
 
 
 class MinesweeperAI():
@@ -140,12 +375,16 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, tracer=None,
+                 seed=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines on the board, if known
+        self.total_mines = mines
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -153,8 +392,14 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Sentences about the game known to be true
+        self.knowledge = Knowledge()
+
+        # Tracer to report each move to, or None for no tracing
+        self.tracer = tracer
+
+        # Random number generator for random moves
+        self.random = random.Random(seed)
 
     def mark_mine(self, cell):
         """
@@ -162,9 +407,7 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        print("*** *** mark mine:", cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        return self.knowledge.mark_mine(cell)
 
     def mark_safe(self, cell):
         """
@@ -172,11 +415,7 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
-
-    def compute_knowledge_coords(self):
-        return set(itertools.chain.from_iterable(sentence.cells for sentence in self.knowledge))
+        return self.knowledge.mark_safe(cell)
 
     def add_knowledge(self, cell, count):
         """
@@ -194,11 +433,21 @@ class MinesweeperAI():
                if they can be inferred from existing knowledge
         """
 
+        if self.tracer is not None:
+            start = time.perf_counter()
+            known = len(self.mines) + len(self.safes)
+
+        # Work counters, reported to the tracer
+        sentences_created = 0
+        rounds = 0
+        subset_checks = 0
+
         # 1 • The function should mark the cell as one of the moves made in the game.
         self.moves_made.add(cell)
 
         # 2 • The function should mark the cell as a safe cell, updating any sentences that contain the cell as well.
-        self.mark_safe(cell)
+        # Sentences that shrink are queued, to be checked for new inferences.
+        pending = self.mark_safe(cell)
 
         # 3 • The function should add a new sentence to the AI’s knowledge base, based on the value of cell and count, to indicate that count of the cell’s neighbors are mines. Be sure to only include cells whose state is still undetermined in the sentence.
         x, y = cell
@@ -220,141 +469,66 @@ class MinesweeperAI():
         valid_adjacent_cells -= self.safes
 
         if len(valid_adjacent_cells) > 0:
-            self.knowledge.append(
-                Sentence(valid_adjacent_cells, new_count))  # use new_count!
-
-        # "Updating" involves checking each sentence for known mines / safes, and marking them on all sentences.
-        def update_knowledge(sentence_list):
-            unmarked_safes = set()
-            unmarked_mines = set()
-
-            # accumulate unmarked mines and safes
-            for sentence in sentence_list:
-                sentence_size = len(sentence.cells)
-                if sentence_size == 0:
-                    self.knowledge.remove(sentence)
-                    continue
-                known_safes = sentence.known_safes()
-                if len(known_safes) > 0:
-                    unmarked_safes |= known_safes
+            new_sentence = Sentence(
+                valid_adjacent_cells, new_count, self.width)  # use new_count!
+            self.knowledge.add(new_sentence)
+            pending.append(new_sentence)
+            sentences_created += 1
+
+        # 4, 5 • Infer from a worklist of sentences that are new or have shrunk.
+        # Only those can give new conclusions: every other pair of sentences
+        # was already checked when the later of the two last changed.
+        while pending:
+            sentence = pending.pop()
+            if sentence not in self.knowledge:
+                continue
+            rounds += 1
+
+            # 4 • Mark cells as safe or as mines, if the sentence tells us which.
+            if len(sentence) == 0:
+                self.knowledge.remove(sentence)
+                continue
+            known_safes = sentence.known_safes()
+            known_mines = sentence.known_mines()
+            if len(known_safes) > 0 or len(known_mines) > 0:
+                self.knowledge.remove(sentence)
+                for safe in list(known_safes):
+                    pending += self.mark_safe(safe)
+                for mine in list(known_mines):
+                    pending += self.mark_mine(mine)
+                continue
+
+            # 5 • Subset method, against the sentences sharing a cell with this one.
+            for other in self.knowledge.overlapping(sentence):
+                subset_checks += 1
+                if other.bits == sentence.bits and other.offset == sentence.offset:
+                    # remove duplicate sentence
                     self.knowledge.remove(sentence)
+                    break
+                if sentence < other:
+                    subset, superset = sentence, other
+                elif other < sentence:
+                    subset, superset = other, sentence
+                else:
                     continue
-                known_mines = sentence.known_mines()
-                if len(known_mines) > 0:
-                    unmarked_mines |= known_mines
-                    self.knowledge.remove(sentence)
-
-            # return the fact that no changes are needed
-            if len(unmarked_mines) == 0 and len(unmarked_safes) == 0:
-                return False
-
-            # update knowledge
-            self.mines |= unmarked_mines
-            self.safes |= unmarked_safes
-            for mine in unmarked_mines:
-                self.mark_mine(mine)
-            for safe in unmarked_safes:
-                self.mark_safe(safe)
-
-            # return the fact that changes have been made
-            return True
-
-        # Keep looping until knowledge is updated completely.
-        count = 0
-        max = 99
-        print()
-        while True:
-            print("loop count:", count)
-            if count >= max:
-                print(f"looped to maximum of {max} times")
-                break
-            count += 1
-            # 4 • If, based on any of the sentences in self.knowledge, new cells can be marked as safe or as mines, then the function should do so.
-
-            is_changes_made1 = update_knowledge(self.knowledge)
-
-        # 5 • If, based on any of the sentences in self.knowledge, new sentences can be inferred (using the subset method described in the Background), then those sentences should be added to the knowledge base as well.
-
-            # detect overlapping sentences, for each relevant coordinate
-            overlaps_per_coord = dict()
-            for coord in self.compute_knowledge_coords():
-                # print(coord)
-                overlaps = []
-                uniques = set()
-                for sentence in self.knowledge:
-                    cells = frozenset(sentence.cells)
-                    count = sentence.count
-                    if coord in cells:
-                        if (cells, count) not in uniques:
-                            overlaps.append(sentence)
-                            uniques.add((cells, count))
-                        else:
-                            # remove duplicate sentence
-                            self.knowledge.remove(sentence)
-                if len(overlaps) >= 2:
-                    overlaps_per_coord[coord] = overlaps
-            # # debug print
-            # for k,v in overlaps_per_coord.items():
-            #     print(k,v)
-
-            # employing subset method with each sentence pair permutation
-            permutations_per_coord = dict()
-            for coord, overlaps in overlaps_per_coord.items():
-                permutations_per_coord[coord] = itertools.permutations(
-                    overlaps, 2)
-            # # debug print
-            # for k,v in permutations_per_coord.items():
-            #     print(k,v)
-
-            # stored as hashable tuples instead of Sentence(), to eliminate duplicates
-            new_sentences = set()
-
-            for coord, permutations in permutations_per_coord.items():
-                print("subset technique for:", coord, end=" ")
-                for j, (left, right) in enumerate(permutations):
-                    if left.cells < right.cells:
-                        print(f"\n{j}", end=" ")
-                        new_sentence_tuple = (  # needs to be hashable
-                            frozenset(right.cells - left.cells),
-                            right.count - left.count
-                        )
-                        print(new_sentence_tuple, end=" ")
-                        new_sentences.add(new_sentence_tuple)
-                    else:
-                        print(j, end=" ")
-                print("\n")
-                # left.cells == right.cells can be ignored because the result will be empty set with 0 count
-
-            new_sentences = list(map(
-                lambda tuple: Sentence(tuple[0], tuple[1]),
-                new_sentences
-            ))
-
-            if len(new_sentences) > 0:
-                print("__add subset technique new sentences__")
-            for ns in new_sentences:
-                print(ns)
-
-            self.knowledge += new_sentences
-            # only new sentences need to be updated here
-            if len(new_sentences) > 0:
-                print("update knowledge (new sentences)")
-                is_changes_made_2 = update_knowledge(new_sentences)
-            else:
-                is_changes_made_2 = False
-
-            is_changes_made = is_changes_made1 or is_changes_made_2
-
-            # no changes made means loop can stop
-            if is_changes_made is False:
-                break
-        print("___knowledge___")
-        for sentence in self.knowledge:
-            print(sentence)
-        print("___mines___")
-        print(self.mines)
-        print("___safe moves___")
-        print(self.safes - self.moves_made)
+                new_sentence = superset - subset
+                if not self.knowledge.has(new_sentence):
+                    self.knowledge.add(new_sentence)
+                    pending.append(new_sentence)
+                    sentences_created += 1
+
+        if self.tracer is not None:
+            self.tracer.emit(
+                "add_knowledge",
+                cell=cell,
+                count=count,
+                sentences_created=sentences_created,
+                inference_rounds=rounds,
+                subset_checks=subset_checks,
+                cells_marked=len(self.mines) + len(self.safes) - known,
+                knowledge=len(self.knowledge),
+                seconds=time.perf_counter() - start
+            )
 
     def make_safe_move(self):
         """
@@ -368,9 +542,8 @@ class MinesweeperAI():
         possible_set = (self.safes - self.moves_made)
         move = next(iter(possible_set)) if len(possible_set) > 0 else None
 
-        if move is not None:
-            print()
-            print("-->", move)
+        if self.tracer is not None and move is not None:
+            self.tracer.emit("safe_move", cell=move, safe_moves=len(possible_set))
         return move
 
     def compute_possible_set(self):
@@ -386,15 +559,40 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+
+        If the total number of mines is known, chooses among the cells
+        least likely to be a mine instead.
         """
+        if self.tracer is not None:
+            start = time.perf_counter()
+
         possible_set = self.compute_possible_set()
 
         if len(possible_set) == 0:
             return None
 
-        move = random.sample(possible_set, 1)[0]
+        # with only known safes left, any of them will do
+        unknown_cells = possible_set - self.safes
+        if self.total_mines is None or len(unknown_cells) == 0:
+            move = self.random.choice(sorted(possible_set))
+        else:
+            probabilities = mine_probabilities(
+                [(sentence.cells, sentence.count)
+                 for sentence in self.knowledge],
+                unknown_cells,
+                self.total_mines - len(self.mines)
+            )
+            lowest = min(probabilities.values())
+            move = self.random.choice(sorted(
+                cell for cell, p in probabilities.items()
+                if p <= lowest + 1e-12
+            ))
 
-        for _ in range(5):
-            print("*")
-        print("??-->", move)
+        if self.tracer is not None:
+            self.tracer.emit(
+                "random_move",
+                cell=move,
+                candidates=len(possible_set),
+                seconds=time.perf_counter() - start
+            )
         return move
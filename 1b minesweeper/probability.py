@@ -0,0 +1,221 @@
+import math
+
+
+def components(sentences):
+    """
+    Split sentences into groups that share no cells.
+    Each sentence is a (cells, count) pair.
+    Returns a list of lists of sentences.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent.setdefault(cell, cell) != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for cells, _ in sentences:
+        cells = list(cells)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            parent[find(cell)] = root
+
+    groups = dict()
+    for sentence in sentences:
+        root = find(next(iter(sentence[0])))
+        groups.setdefault(root, []).append(sentence)
+    return list(groups.values())
+
+
+def cell_order(sentences):
+    """
+    Order the cells of connected sentences breadth first, so that each
+    sentence's cells are close together and few sentences are open at once.
+    """
+    neighbours = dict()
+    for cells, _ in sentences:
+        for cell in cells:
+            neighbours.setdefault(cell, set()).update(cells)
+    start = min(neighbours)
+    order = [start]
+    seen = {start}
+    for cell in order:
+        for neighbour in sorted(neighbours[cell] - seen):
+            seen.add(neighbour)
+            order.append(neighbour)
+    return order
+
+
+def count_component(sentences):
+    """
+    Count the assignments of mines to the cells of connected sentences
+    that satisfy every sentence.
+
+    Cells are assigned one at a time. The state after each cell is the
+    number of mines each sentence still needs, so assignments that reach
+    the same state are counted together (a forward pass), and so are the
+    ways of completing an assignment from each state (a backward pass).
+
+    Returns a tuple (cells, totals, mines) where totals[k] is the number of
+    assignments with k mines, and mines[cell][k] is the number of those
+    with a mine on cell.
+    """
+    cells = cell_order(sentences)
+    position = {cell: p for p, cell in enumerate(cells)}
+    n = len(cells)
+
+    # For each position, the sentences containing that cell
+    containing = [[] for _ in range(n)]
+    # For each sentence, the number of its cells after each position
+    after = []
+    for s, (sentence_cells, _) in enumerate(sentences):
+        positions = sorted(position[cell] for cell in sentence_cells)
+        for p in positions:
+            containing[p].append(s)
+        remaining = dict()
+        for k, p in enumerate(positions):
+            remaining[p] = len(positions) - k - 1
+        after.append(remaining)
+
+    def step(state, p, mine):
+        """
+        Return the state after assigning position p, or None if a
+        sentence can no longer be satisfied.
+        """
+        if not mine and not containing[p]:
+            return state
+        state = list(state)
+        for s in containing[p]:
+            state[s] -= mine
+            if state[s] < 0 or state[s] > after[s][p]:
+                return None
+        return tuple(state)
+
+    # Forward pass: ways to reach each state with k mines so far
+    forward = [{tuple(count for _, count in sentences): {0: 1}}]
+    for p in range(n):
+        layer = dict()
+        for state, ways in forward[p].items():
+            for mine in (0, 1):
+                new_state = step(state, p, mine)
+                if new_state is None:
+                    continue
+                counts = layer.setdefault(new_state, dict())
+                for k, w in ways.items():
+                    counts[k + mine] = counts.get(k + mine, 0) + w
+        forward.append(layer)
+
+    # Backward pass: ways to complete from each reachable state with k mines
+    backward = [None] * (n + 1)
+    backward[n] = {state: {0: 1} for state in forward[n]}
+    for p in range(n - 1, -1, -1):
+        layer = dict()
+        for state in forward[p]:
+            counts = dict()
+            for mine in (0, 1):
+                new_state = step(state, p, mine)
+                if new_state is None or new_state not in backward[p + 1]:
+                    continue
+                for k, w in backward[p + 1][new_state].items():
+                    counts[k + mine] = counts.get(k + mine, 0) + w
+            if counts:
+                layer[state] = counts
+        backward[p] = layer
+
+    size = n + 1
+    totals = [0] * size
+    for ways in forward[n].values():
+        for k, w in ways.items():
+            totals[k] += w
+
+    mines = dict()
+    for p, cell in enumerate(cells):
+        counts = [0] * size
+        for state, ways in forward[p].items():
+            new_state = step(state, p, 1)
+            if new_state is None or new_state not in backward[p + 1]:
+                continue
+            for k1, w1 in ways.items():
+                for k2, w2 in backward[p + 1][new_state].items():
+                    counts[k1 + 1 + k2] += w1 * w2
+        mines[cell] = counts
+    return cells, totals, mines
+
+
+def convolve(a, b):
+    """
+    Multiply two polynomials given as lists of coefficients.
+    """
+    result = [0] * (len(a) + len(b) - 1)
+    for i, x in enumerate(a):
+        if x:
+            for j, y in enumerate(b):
+                result[i + j] += x * y
+    return result
+
+
+def mine_probabilities(sentences, unknown_cells, mines_left):
+    """
+    Return a dictionary mapping each cell in `unknown_cells` to the
+    probability that it is a mine.
+
+    `sentences` is a list of (cells, count) pairs, whose cells are all in
+    `unknown_cells`, and `mines_left` is the number of mines among the
+    unknown cells. Every arrangement of mines consistent with both is
+    taken to be equally likely.
+
+    Sentences that share no cells are counted separately, and combined by
+    the number of mines each uses; the cells in no sentence share out the
+    mines that are left.
+    """
+    if len(unknown_cells) == 0:
+        return dict()
+    sentences = [(set(cells), count) for cells, count in sentences if cells]
+    counted = [count_component(group) for group in components(sentences)]
+    constrained = set()
+    for cells, _, _ in counted:
+        constrained.update(cells)
+    others = len(unknown_cells) - len(constrained)
+
+    def weight(frontier_mines, cells, mines):
+        """Ways to place `mines` of the remaining mines among `cells`."""
+        mines -= frontier_mines
+        return math.comb(cells, mines) if 0 <= mines <= cells else 0
+
+    # prefix[c] and suffix[c] combine the components before and after c
+    prefix = [[1]]
+    for _, totals, _ in counted:
+        prefix.append(convolve(prefix[-1], totals))
+    suffix = [[1]]
+    for _, totals, _ in reversed(counted):
+        suffix.append(convolve(suffix[-1], totals))
+    suffix.reverse()
+    everything = prefix[-1]
+
+    total = sum(ways * weight(s, others, mines_left)
+                for s, ways in enumerate(everything))
+    if total == 0:
+        # the sentences and mine count disagree; know nothing
+        return {cell: mines_left / len(unknown_cells) for cell in unknown_cells}
+
+    probabilities = dict()
+    for c, (cells, _, mines) in enumerate(counted):
+        # rest_ways[k]: ways for everything else, given k mines in component c
+        rest = convolve(prefix[c], suffix[c + 1])
+        rest_ways = [
+            sum(r * weight(k + s, others, mines_left)
+                for s, r in enumerate(rest))
+            for k in range(len(cells) + 1)
+        ]
+        for cell in cells:
+            ways = sum(w * rest_ways[k] for k, w in enumerate(mines[cell]))
+            probabilities[cell] = ways / total
+
+    if others > 0:
+        other_ways = sum(ways * weight(s + 1, others - 1, mines_left)
+                         for s, ways in enumerate(everything))
+        p = other_ways / total
+        for cell in unknown_cells - constrained:
+            probabilities[cell] = p
+    return probabilities
@@ -0,0 +1,126 @@
+import multiprocessing
+import os
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Share of each game's moves in each bucket of the knowledge size report
+PROGRESS_BUCKETS = 10
+
+
+def play(height, width, mines, seed):
+    """
+    Play one game with the AI, without a display.
+
+    Return a dictionary with whether the AI won, the number of moves, the
+    time each move took (choosing it and updating the knowledge), and the
+    number of sentences in the knowledge base after each move.
+    """
+    game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+    # the AI gets its own random stream, independent of the board's
+    ai = MinesweeperAI(height=height, width=width, mines=mines,
+                       seed=f"ai-{seed}")
+    latencies = []
+    knowledge_sizes = []
+    safe_cells = height * width - mines
+    won = False
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        ai.add_knowledge(move, game.nearby_mines(move))
+        latencies.append(time.perf_counter() - start)
+        knowledge_sizes.append(len(ai.knowledge))
+        if len(ai.moves_made) == safe_cells:
+            won = True
+            break
+
+    return {
+        "seed": seed,
+        "won": won,
+        "moves": len(latencies),
+        "latencies": latencies,
+        "knowledge_sizes": knowledge_sizes
+    }
+
+
+def play_seed(args):
+    return play(*args)
+
+
+def simulate(games, height, width, mines, seed=0, processes=None):
+    """
+    Play `games` games across a pool of processes.
+    Game n uses seed (`seed` + n), so every run is reproducible.
+    Return the list of results from `play`, in seed order.
+    """
+    tasks = [(height, width, mines, seed + n) for n in range(games)]
+    with multiprocessing.Pool(processes) as pool:
+        results = list(pool.imap_unordered(play_seed, tasks))
+    return sorted(results, key=lambda result: result["seed"])
+
+
+def percentile(values, p):
+    """
+    Return the `p`th percentile of a sorted list, by nearest rank.
+    """
+    if not values:
+        return 0
+    rank = max(0, min(len(values) - 1, round(p / 100 * len(values)) - 1))
+    return values[rank]
+
+
+def report(results, seconds):
+    """
+    Print win rate, move throughput, latency percentiles, and the mean
+    knowledge base size over the course of a game.
+    """
+    games = len(results)
+    wins = sum(result["won"] for result in results)
+    latencies = sorted(
+        latency for result in results for latency in result["latencies"]
+    )
+    moves = len(latencies)
+    print(f"Games: {games}, won {wins} ({wins / games:.1%})")
+    if moves == 0:
+        return
+    print(f"Moves: {moves}, {moves / sum(latencies):,.0f} moves/s per process,"
+          f" {moves / seconds:,.0f} moves/s overall")
+    print("Latency per move:")
+    for p in [50, 90, 99, 100]:
+        print(f"  p{p}: {percentile(latencies, p) * 1000:.3f} ms")
+
+    print("Knowledge base size by game progress:")
+    buckets = [[] for _ in range(PROGRESS_BUCKETS)]
+    for result in results:
+        sizes = result["knowledge_sizes"]
+        for n, size in enumerate(sizes):
+            buckets[n * PROGRESS_BUCKETS // len(sizes)].append(size)
+    for n, sizes in enumerate(buckets):
+        if sizes:
+            low = n * 100 // PROGRESS_BUCKETS
+            high = (n + 1) * 100 // PROGRESS_BUCKETS
+            print(f"  {low:3}-{high:3}% of moves: "
+                  f"mean {sum(sizes) / len(sizes):.1f}, max {max(sizes)}")
+
+
+def main():
+    if len(sys.argv) not in [5, 6, 7]:
+        sys.exit("Usage: python simulate.py games height width mines "
+                 "[seed] [processes]")
+    games, height, width, mines = [int(arg) for arg in sys.argv[1:5]]
+    seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+    processes = int(sys.argv[6]) if len(sys.argv) > 6 else os.cpu_count()
+
+    start = time.perf_counter()
+    results = simulate(games, height, width, mines, seed, processes)
+    report(results, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
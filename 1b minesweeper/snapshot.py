@@ -0,0 +1,155 @@
+import gzip
+import json
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI, Sentence
+
+FORMAT_VERSION = 1
+
+# Number of slowest steps listed by replay
+SLOWEST = 10
+
+
+def positions(cells, width):
+    """
+    Return the sorted row-major positions of a collection of cells.
+    """
+    return sorted(i * width + j for i, j in cells)
+
+
+def cells(positions, width):
+    """
+    Return the set of cells at a list of row-major positions.
+    """
+    return {divmod(position, width) for position in positions}
+
+
+def save(filename, game, moves, ai=None):
+    """
+    Save a game to a gzipped JSON file: the board's mines, the log of
+    moves made as (cell, nearby mines) pairs, and optionally the AI's
+    state (moves made, known mines and safes, and knowledge).
+    Cells are stored as row-major positions, sentences as
+    (offset, hex bits, count).
+    """
+    width = game.width
+    data = {
+        "version": FORMAT_VERSION,
+        "height": game.height,
+        "width": width,
+        "mines": positions(game.mines, width),
+        "moves": [[i * width + j, nearby] for (i, j), nearby in moves]
+    }
+    if ai is not None:
+        data["ai"] = {
+            "total_mines": ai.total_mines,
+            "moves_made": positions(ai.moves_made, width),
+            "mines": positions(ai.mines, width),
+            "safes": positions(ai.safes, width),
+            "knowledge": [
+                [sentence.offset, format(sentence.bits, "x"), sentence.count]
+                for sentence in ai.knowledge
+            ]
+        }
+    with gzip.open(filename, "wt") as f:
+        json.dump(data, f, separators=(",", ":"))
+
+
+def load(filename):
+    """
+    Load a game saved by `save`.
+    Return a tuple (game, moves, ai), where ai is None if no AI state
+    was saved.
+    """
+    with gzip.open(filename, "rt") as f:
+        data = json.load(f)
+    if data["version"] != FORMAT_VERSION:
+        raise ValueError(f"unsupported snapshot version {data['version']}")
+
+    height, width = data["height"], data["width"]
+    game = Minesweeper.from_mines(height, width, cells(data["mines"], width))
+    moves = [(divmod(position, width), nearby)
+             for position, nearby in data["moves"]]
+
+    ai = None
+    if "ai" in data:
+        state = data["ai"]
+        ai = MinesweeperAI(height=height, width=width,
+                           mines=state["total_mines"])
+        ai.moves_made = cells(state["moves_made"], width)
+        ai.mines = cells(state["mines"], width)
+        ai.safes = cells(state["safes"], width)
+        for offset, bits, count in state["knowledge"]:
+            ai.knowledge.add(
+                Sentence.from_bits(int(bits, 16), offset, count, width))
+    return game, moves, ai
+
+
+def record(height, width, mines, seed):
+    """
+    Play a seeded game with the AI, without a display.
+    Return a tuple (game, moves, ai) ready to be saved.
+    """
+    game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+    ai = MinesweeperAI(height=height, width=width, mines=mines,
+                       seed=f"ai-{seed}")
+    moves = []
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+        if move is None or game.is_mine(move):
+            break
+        nearby = game.nearby_mines(move)
+        ai.add_knowledge(move, nearby)
+        moves.append((move, nearby))
+    return game, moves, ai
+
+
+def replay(game, moves, mines=None):
+    """
+    Re-run add_knowledge for each logged move on a fresh AI, timing
+    every step. Return the AI and a list of (seconds, step, cell,
+    knowledge size) tuples, one per move.
+    """
+    ai = MinesweeperAI(height=game.height, width=game.width, mines=mines)
+    steps = []
+    for step, (cell, nearby) in enumerate(moves):
+        start = time.perf_counter()
+        ai.add_knowledge(cell, nearby)
+        seconds = time.perf_counter() - start
+        steps.append((seconds, step, cell, len(ai.knowledge)))
+    return ai, steps
+
+
+def main():
+    if len(sys.argv) == 7 and sys.argv[1] == "record":
+        height, width, mines, seed = [int(arg) for arg in sys.argv[2:6]]
+        game, moves, ai = record(height, width, mines, seed)
+        save(sys.argv[6], game, moves, ai)
+        print(f"Saved {len(moves)} moves to {sys.argv[6]}")
+
+    elif len(sys.argv) == 3 and sys.argv[1] == "replay":
+        game, moves, saved = load(sys.argv[2])
+        mines = len(game.mines)
+        ai, steps = replay(game, moves, mines)
+        total = sum(seconds for seconds, _, _, _ in steps)
+        print(f"Replayed {len(steps)} moves in {total * 1000:.1f} ms")
+        print("Slowest steps:")
+        for seconds, step, cell, size in sorted(steps, reverse=True)[:SLOWEST]:
+            print(f"  step {step}, cell {cell}: {seconds * 1000:.3f} ms, "
+                  f"{size} sentences after")
+        if saved is not None:
+            same = (ai.mines == saved.mines and ai.safes == saved.safes
+                    and ai.moves_made == saved.moves_made)
+            print("Final state matches snapshot" if same else
+                  "! Final state differs from snapshot")
+
+    else:
+        sys.exit("Usage: python snapshot.py record height width mines seed "
+                 "file\n       python snapshot.py replay file")
+
+
+if __name__ == "__main__":
+    main()
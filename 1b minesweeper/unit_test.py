@@ -0,0 +1,49 @@
+from minesweeper import Minesweeper, MinesweeperAI, Sentence
+
+
+def check(name, passed):
+    print(f"___{name}")
+    print("* pass" if passed else "! fail")
+    print()
+
+
+# Sentences on a board wider than 8 keep their cells apart
+sentence = Sentence({(0, 8), (1, 0)}, 1, width=10)
+check("Sentence on a 10-wide board",
+      sentence.cells == {(0, 8), (1, 0)} and len(sentence) == 2)
+
+# ... and without the width, cells past the default board are rejected
+try:
+    Sentence({(0, 9)}, 1)
+    rejected = False
+except ValueError:
+    rejected = True
+check("Sentence outside the default width", rejected)
+
+# The AI plays through a 5x12 board without stepping on a known mine
+game = Minesweeper(height=5, width=12, mines=6, seed=1)
+ai = MinesweeperAI(height=5, width=12, mines=6, seed=1)
+lost = False
+while not lost:
+    move = ai.make_safe_move() or ai.make_random_move()
+    if move is None:
+        break
+    if game.is_mine(move):
+        lost = move in ai.safes
+        ai.mark_mine(move)
+        ai.moves_made.add(move)
+        continue
+    ai.add_knowledge(move, game.nearby_mines(move))
+check("MinesweeperAI on a 5x12 board",
+      not lost and ai.mines <= game.mines
+      and all(not game.is_mine(cell) for cell in ai.safes))
+
+# A random move is still found when every cell left is a known safe
+ai = MinesweeperAI(height=1, width=2, mines=0)
+ai.add_knowledge((0, 0), 0)
+check("make_random_move with only safes left", ai.make_random_move() == (0, 1))
+
+# The board can still be read as rows of cells
+game = Minesweeper.from_mines(3, 4, {(1, 2)})
+check("Minesweeper.board rows",
+      game.board[1][2] and not game.board[2][1] and len(game.board[0]) == 4)
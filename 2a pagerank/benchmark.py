@@ -0,0 +1,293 @@
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+import crawler
+import generator
+import graphfile
+import incremental
+import pagerank
+import personalized
+import sampler
+import sparse
+
+# Synthetic corpus sizes, in pages
+SIZES = [100, 1000, 10000]
+
+# Largest corpus to run the original, O(N) per step, sampler on
+SLOW_SAMPLER_LIMIT = 1000
+WALKERS = 1000
+
+# Parallel sampler: corpus size, samples, and the target interval half-width
+PARALLEL_PAGES = 10000
+PARALLEL_SAMPLES = 1000000
+PROCESS_COUNTS = [1, 2, 4]
+TARGET_ERROR = 1e-4
+
+# Convergence: bundled corpora, and synthetic sizes, for each variant
+CORPORA = ["corpus0", "corpus1", "corpus2"]
+CONVERGENCE_SIZES = [1000, 10000]
+VARIANTS = [
+    ("Jacobi", dict(method=pagerank.JACOBI)),
+    ("Gauss-Seidel", dict(method=pagerank.GAUSS_SEIDEL)),
+    ("Jacobi, extrapolated", dict(extrapolate=True)),
+    ("Gauss-Seidel, extrapolated",
+     dict(method=pagerank.GAUSS_SEIDEL, extrapolate=True)),
+    ("Jacobi, freezing", dict(freeze=True)),
+    ("Gauss-Seidel, freezing", dict(method=pagerank.GAUSS_SEIDEL, freeze=True))
+]
+
+# Incremental updates: link changes per update, and updates timed
+CHANGES_PER_UPDATE = 2
+UPDATES = 10
+
+# Personalized PageRank: seed pages queried, and pages returned for each
+SEED_PAGES = 20
+TOP = 10
+
+# Graph files: pages, and links read per block
+GRAPH_FILE_PAGES = 100000
+GRAPH_BLOCK_SIZE = 1 << 16
+
+# Crawler: pages written to disk, and the share changed before a recrawl
+CRAWL_PAGES = 100000
+CHANGED_SHARE = 0.01
+
+
+def timed(function):
+    """
+    Call `function` once. Return its result and the time taken in seconds.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def max_difference(a, b):
+    return max(abs(a[page] - b[page]) for page in a)
+
+
+def main():
+    for n in SIZES:
+        corpus = generator.generate_corpus(n)
+        print(f"{n} pages")
+        expected, seconds = timed(
+            lambda: pagerank.iterate_pagerank(corpus, pagerank.DAMPING))
+        print(f"  iterate_pagerank: {seconds * 1000:.1f} ms")
+        ranks, seconds = timed(
+            lambda: sparse.iterate_pagerank(corpus, pagerank.DAMPING))
+        print(f"  sparse.iterate_pagerank: {seconds * 1000:.1f} ms, "
+              f"max difference {max_difference(ranks, expected):.2e}")
+        expected = ranks
+
+        samples = pagerank.SAMPLES
+        if n <= SLOW_SAMPLER_LIMIT:
+            ranks, seconds = timed(lambda: pagerank.sample_pagerank(
+                corpus, pagerank.DAMPING, samples))
+            print(f"  sample_pagerank: {seconds * 1000:.1f} ms, "
+                  f"max difference {max_difference(ranks, expected):.2e}")
+        for walkers in [1, WALKERS]:
+            ranks, seconds = timed(lambda: sampler.sample_pagerank(
+                corpus, pagerank.DAMPING, samples, walkers, seed=0))
+            print(f"  sampler.sample_pagerank, {walkers} walkers: "
+                  f"{seconds * 1000:.1f} ms, "
+                  f"max difference {max_difference(ranks, expected):.2e}")
+    parallel()
+    convergence()
+    updates()
+    related()
+    on_disk()
+    crawling()
+
+
+def parallel():
+    corpus = generator.generate_corpus(PARALLEL_PAGES)
+    expected = sparse.iterate_pagerank(corpus, pagerank.DAMPING)
+    print(f"Parallel sampler, {PARALLEL_PAGES} pages, "
+          f"{PARALLEL_SAMPLES} samples, {WALKERS} walkers")
+    for processes in PROCESS_COUNTS:
+        (ranks, intervals), seconds = timed(
+            lambda: sampler.parallel_sample_pagerank(
+                corpus, pagerank.DAMPING, PARALLEL_SAMPLES, processes,
+                walkers=WALKERS, seed=0))
+        covered = sum(abs(ranks[page] - expected[page]) <= intervals[page]
+                      for page in ranks) / len(ranks)
+        print(f"  {processes} processes: {seconds * 1000:.1f} ms, "
+              f"max difference {max_difference(ranks, expected):.2e}, "
+              f"{covered:.1%} of pages within their interval")
+    needed = sampler.samples_needed(intervals.values(), PARALLEL_SAMPLES,
+                                    TARGET_ERROR)
+    print(f"  widest interval {max(intervals.values()):.2e}, "
+          f"about {needed} samples needed for {TARGET_ERROR:.0e}")
+
+
+def convergence():
+    print("Sweeps for pagerank.iterate_pagerank to converge")
+    corpora = [(name, pagerank.crawl(name)) for name in CORPORA]
+    corpora += [(f"{n} pages", generator.generate_corpus(n))
+                for n in CONVERGENCE_SIZES]
+    for name, corpus in corpora:
+        expected = sparse.iterate_pagerank(corpus, pagerank.DAMPING)
+        print(f"  {name}")
+        for variant, options in VARIANTS:
+            residuals = []
+            ranks, seconds = timed(lambda: pagerank.iterate_pagerank(
+                corpus, pagerank.DAMPING,
+                callback=lambda i, residual, t: residuals.append(residual),
+                **options))
+            print(f"    {variant}: {len(residuals)} sweeps, "
+                  f"{seconds * 1000:.1f} ms, "
+                  f"max difference {max_difference(ranks, expected):.2e}")
+
+
+def updates():
+    print(f"Incremental updates, {CHANGES_PER_UPDATE} link changes each, "
+          f"mean of {UPDATES}")
+    for n in SIZES:
+        corpus = generator.generate_corpus(n)
+        state = incremental.IncrementalPageRank(corpus, pagerank.DAMPING)
+        rng = random.Random(0)
+        pages = sorted(corpus)
+        update_time = full_time = 0
+        iterations = pushes = 0
+        for _ in range(UPDATES):
+            added = [(rng.choice(pages), rng.choice(pages))
+                     for _ in range(CHANGES_PER_UPDATE // 2)]
+            removed = [(page, min(corpus[page]))
+                       for page in rng.sample(pages, CHANGES_PER_UPDATE // 2)
+                       if corpus[page]]
+            stats = dict()
+            ranks, seconds = timed(lambda: state.update(added, removed, stats))
+            update_time += seconds
+            iterations += stats["iterations"]
+            pushes += stats["pushes"]
+
+            for page, link in added:
+                if page != link:
+                    corpus[page].add(link)
+            for page, link in removed:
+                corpus[page].discard(link)
+            expected, seconds = timed(
+                lambda: sparse.iterate_pagerank(corpus, pagerank.DAMPING))
+            full_time += seconds
+            assert max_difference(ranks, expected) < sparse.TOLERANCE
+        print(f"  {n} pages: update {update_time / UPDATES * 1000:.1f} ms "
+              f"({iterations / UPDATES:.1f} iterations, "
+              f"{pushes / UPDATES:.0f} pushes), "
+              f"full {full_time / UPDATES * 1000:.1f} ms")
+
+
+def exact_personalized(matrix, seed, damping_factor, iterations=100):
+    """
+    Return the personalized PageRank vector for one seed page number, by
+    power iteration over a LinkMatrix.
+    """
+    jump = np.zeros(len(matrix))
+    jump[seed] = 1
+    ranks = jump.copy()
+    for _ in range(iterations):
+        dangling_rank = ranks[matrix.dangling].sum()
+        ranks = (damping_factor * (matrix.dot(ranks) + dangling_rank * jump)
+                 + (1 - damping_factor) * jump)
+    return ranks
+
+
+def related():
+    print(f"Personalized PageRank, top {TOP} for {SEED_PAGES} seed pages")
+    for n in SIZES:
+        corpus = generator.generate_corpus(n)
+        matrix = sparse.LinkMatrix(corpus)
+        rng = random.Random(0)
+        seeds = rng.sample(matrix.pages, SEED_PAGES)
+
+        expected, exact_time = timed(lambda: [
+            exact_personalized(matrix, matrix.index[seed], pagerank.DAMPING)
+            for seed in seeds
+        ])
+        ranking = personalized.PersonalizedPageRank(corpus, pagerank.DAMPING)
+        results, seconds = timed(lambda: ranking.top_batch(seeds, TOP))
+
+        found = 0
+        for seed, ranks, result in zip(seeds, expected, results):
+            ranks[matrix.index[seed]] = 0
+            best = {matrix.pages[i] for i in np.argsort(-ranks)[:TOP]}
+            found += len(best & {page for page, _ in result})
+        print(f"  {n} pages: push {seconds / SEED_PAGES * 1000:.1f} ms, "
+              f"power iteration {exact_time / SEED_PAGES * 1000:.1f} ms "
+              f"per seed, {found / (TOP * SEED_PAGES):.0%} of the top "
+              f"{TOP} found")
+
+
+def peak_memory(function):
+    """
+    Call `function` once. Return its result, the time taken in seconds,
+    and the most memory allocated at once while it ran, in bytes.
+    """
+    tracemalloc.start()
+    result, seconds = timed(function)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, seconds, peak
+
+
+def on_disk():
+    corpus = generator.generate_corpus(GRAPH_FILE_PAGES)
+    print(f"Graph file, {GRAPH_FILE_PAGES} pages")
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.bin")
+        _, seconds = timed(lambda: graphfile.write_graph(path, corpus))
+        print(f"  written in {seconds * 1000:.0f} ms, "
+              f"{os.path.getsize(path):,} bytes")
+        graph = graphfile.LinkGraphFile(path, GRAPH_BLOCK_SIZE)
+
+        expected, seconds, peak = peak_memory(
+            lambda: sparse.iterate_pagerank(corpus, pagerank.DAMPING))
+        print(f"  sparse.iterate_pagerank, in memory: {seconds * 1000:.0f} ms, "
+              f"peak {peak / 2 ** 20:.1f} MiB")
+
+        (ranks, _), seconds, peak = peak_memory(
+            lambda: sparse.power_iterate(graph, pagerank.DAMPING))
+        ranks = dict(zip(graph.pages, ranks.tolist()))
+        print(f"  sparse.power_iterate, from file: {seconds * 1000:.0f} ms, "
+              f"peak {peak / 2 ** 20:.1f} MiB, "
+              f"max difference {max_difference(ranks, expected):.2e}")
+
+        ranks, seconds = timed(lambda: sampler.sample_pagerank(
+            graph, pagerank.DAMPING, pagerank.SAMPLES, WALKERS, seed=0))
+        print(f"  sampler.sample_pagerank, from file: {seconds * 1000:.0f} ms, "
+              f"max difference {max_difference(ranks, expected):.2e}")
+
+
+def crawling():
+    corpus = generator.generate_corpus(CRAWL_PAGES)
+    print(f"Crawling {CRAWL_PAGES} pages")
+    with tempfile.TemporaryDirectory() as directory:
+        generator.write_corpus(corpus, directory)
+        cache = os.path.join(directory, "links.json")
+
+        result, seconds = timed(lambda: pagerank.crawl(directory))
+        assert result == corpus
+        print(f"  pagerank.crawl: {CRAWL_PAGES / seconds:,.0f} pages/s")
+
+        rng = random.Random(0)
+        pages = sorted(corpus)
+        changed = rng.sample(pages, int(CRAWL_PAGES * CHANGED_SHARE))
+        for run in ["cold", "warm", "changed"]:
+            if run == "changed":
+                for page in changed:
+                    corpus[page] = set(rng.sample(pages, 3)) - {page}
+                generator.write_corpus(
+                    {page: corpus[page] for page in changed}, directory)
+            stats = dict()
+            assert crawler.crawl(directory, cache, stats=stats) == corpus
+            print(f"  crawler.crawl, {run} cache: "
+                  f"{stats['pages_per_second']:,.0f} pages/s, "
+                  f"{stats['parsed']} parsed")
+
+
+if __name__ == "__main__":
+    main()
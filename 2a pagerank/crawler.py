@@ -0,0 +1,189 @@
+import itertools
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from graphfile import GraphWriter, LinkGraphFile
+
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from a file at a time
+CHUNK_SIZE = 1 << 16
+# Files parsed by a thread per task, so that scheduling costs little
+BATCH_SIZE = 256
+CACHE_VERSION = 1
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python crawler.py corpus [cache [graph]]")
+    cache = sys.argv[2] if len(sys.argv) >= 3 else None
+    output = sys.argv[3] if len(sys.argv) == 4 else None
+    stats = dict()
+    corpus = crawl(sys.argv[1], cache=cache, stats=stats, output=output)
+    if output is None:
+        links = sum(len(links) for links in corpus.values())
+    else:
+        links = corpus.links
+    print(f"{len(corpus)} pages, {links} links")
+    print(f"{stats['parsed']} parsed, {stats['cached']} from cache, "
+          f"{stats['pages_per_second']:,.0f} pages/s")
+
+
+def parse_links(path):
+    """
+    Return the set of links in the HTML file at `path`, reading it a
+    chunk at a time.
+
+    A link can be split between chunks, so whatever follows the last
+    match and starts with an unclosed "<" is kept for the next chunk.
+    """
+    links = set()
+    with open(path) as f:
+        rest = ""
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            text = rest + chunk
+            end = 0
+            for match in LINK.finditer(text):
+                links.add(match.group(1))
+                end = match.end()
+            if not chunk:
+                return links
+            start = text.rfind("<", end)
+            rest = text[start:] if start >= 0 else ""
+
+
+def parse_batch(paths):
+    """
+    Return a list of the sets of links in each HTML file in `paths`.
+    """
+    return [parse_links(path) for path in paths]
+
+
+def load_cache(path):
+    """
+    Return the cached entries at `path`, mapping each filename to a tuple
+    (mtime, size, links), or an empty dictionary if there is no usable
+    cache. Links are kept as lists, as loaded.
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return dict()
+    if data.get("version") != CACHE_VERSION:
+        return dict()
+    return {
+        filename: (mtime, size, links)
+        for filename, (mtime, size, links) in data["files"].items()
+    }
+
+
+def save_cache(path, entries):
+    """
+    Write cache entries to `path`, replacing the old cache only once the
+    new one is complete.
+    """
+    data = {
+        "version": CACHE_VERSION,
+        "files": {
+            filename: [mtime, size, sorted(links)]
+            for filename, (mtime, size, links) in entries.items()
+        }
+    }
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump(data, f)
+    os.replace(temporary, path)
+
+
+def crawl(directory, cache=None, threads=None, stats=None, output=None):
+    """
+    Parse a directory of HTML pages and check for links to other pages.
+    Return a dictionary where each key is a page, and values are
+    a set of all other pages in the corpus that are linked to by the page.
+
+    Files are parsed by a pool of `threads` threads. If `cache` is a path,
+    each file's links are kept there with its modification time and size,
+    and a later crawl only parses files that are new or have changed.
+
+    If `output` is a path, the links are written there as a graph file,
+    a batch of pages at a time, and a LinkGraphFile reading it is
+    returned instead, so the links are never all in memory (unless
+    they are cached).
+
+    If `stats` is a dictionary, it is filled with the number of pages
+    parsed and taken from the cache, the elapsed time, and pages per second.
+    """
+    start = time.perf_counter()
+    entries = load_cache(cache) if cache else dict()
+
+    files = dict()
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.name.endswith(".html") and entry.is_file():
+                info = entry.stat()
+                files[entry.name] = (entry.path, info.st_mtime_ns, info.st_size)
+    filenames = sorted(files)
+    index = {filename: i for i, filename in enumerate(filenames)}
+
+    pages = dict()
+    current = dict()
+    parsed = 0
+    writer = None if output is None else GraphWriter(output, filenames)
+    with ThreadPoolExecutor(threads) as pool:
+        # a batch for each thread at a time, in page order
+        step = BATCH_SIZE * (threads or os.cpu_count() or 1) * 4
+        for first in range(0, len(filenames), step):
+            group = filenames[first:first + step]
+
+            # Keep cached links for unchanged files, and parse the rest
+            links = dict()
+            changed = []
+            for filename in group:
+                _, mtime, size = files[filename]
+                cached = entries.get(filename)
+                if cached is not None and cached[:2] == (mtime, size):
+                    links[filename] = cached[2]
+                else:
+                    changed.append(filename)
+            paths = [files[filename][0] for filename in changed]
+            batches = [paths[i:i + BATCH_SIZE]
+                       for i in range(0, len(paths), BATCH_SIZE)]
+            results = itertools.chain.from_iterable(
+                pool.map(parse_batch, batches))
+            links.update(zip(changed, results))
+            parsed += len(changed)
+
+            for filename in group:
+                if cache:
+                    _, mtime, size = files[filename]
+                    current[filename] = (mtime, size, links[filename])
+                # Only include links to other pages in the corpus
+                targets = index.keys() & links[filename]
+                targets.discard(filename)
+                if writer is None:
+                    pages[filename] = targets
+                else:
+                    writer.add(index[target] for target in targets)
+
+    if writer is not None:
+        writer.close()
+    if cache and (parsed or len(current) != len(entries)):
+        save_cache(cache, current)
+
+    if stats is not None:
+        seconds = time.perf_counter() - start
+        stats["parsed"] = parsed
+        stats["cached"] = len(files) - parsed
+        stats["seconds"] = seconds
+        stats["pages_per_second"] = len(files) / seconds if seconds else 0.0
+    return pages if writer is None else LinkGraphFile(output)
+
+
+if __name__ == "__main__":
+    main()
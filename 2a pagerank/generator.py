@@ -0,0 +1,78 @@
+import itertools
+import os
+import random
+import sys
+
+LINKS_PER_PAGE = 8
+DANGLING_SHARE = 0.05
+POWER_LAW_EXPONENT = 1.0
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python generator.py directory pages [components] [seed]")
+    directory, n = sys.argv[1], int(sys.argv[2])
+    components = int(sys.argv[3]) if len(sys.argv) >= 4 else 1
+    seed = int(sys.argv[4]) if len(sys.argv) == 5 else None
+    corpus = generate_corpus(n, components, seed)
+    os.makedirs(directory, exist_ok=True)
+    write_corpus(corpus, directory)
+    links = sum(len(links) for links in corpus.values())
+    print(f"{n} pages, {links} links, {components} components")
+
+
+def generate_corpus(n, components=1, seed=0,
+                    links_per_page=LINKS_PER_PAGE,
+                    dangling_share=DANGLING_SHARE,
+                    exponent=POWER_LAW_EXPONENT):
+    """
+    Return a corpus of `n` pages, named 0.html to (n - 1).html, split
+    into `components` groups with no links between them.
+
+    Page k is in group k % components, and the pages of each group link
+    to each other with in-degrees that follow a power law: the group's
+    i-th page is linked to with weight 1 / (i + 1) ** exponent. Each page
+    has between 1 and 2 * links_per_page links (fewer once repeats and
+    links to itself are dropped), except for a share `dangling_share` of
+    pages that link to nothing.
+    """
+    rng = random.Random(seed)
+    pages = [f"{k}.html" for k in range(n)]
+    groups = [pages[c::components] for c in range(components)]
+    weights = [
+        list(itertools.accumulate(
+            1 / (i + 1) ** exponent for i in range(len(group))))
+        for group in groups
+    ]
+    corpus = dict()
+    for k, page in enumerate(pages):
+        if rng.random() < dangling_share:
+            corpus[page] = set()
+            continue
+        c = k % components
+        count = rng.randint(1, 2 * links_per_page)
+        links = set(rng.choices(groups[c], cum_weights=weights[c], k=count))
+        corpus[page] = links - {page}
+    return corpus
+
+
+def write_corpus(corpus, directory):
+    """
+    Write each page of `corpus` to `directory` as an HTML file laid out
+    like the bundled corpora, with a list of its links.
+    """
+    for page, links in corpus.items():
+        title = page[:-len(".html")]
+        with open(os.path.join(directory, page), "w") as f:
+            f.write("<!DOCTYPE html>\n<html lang=\"en\">\n")
+            f.write(f"    <head>\n        <title>{title}</title>\n    </head>\n")
+            f.write(f"    <body>\n        <h1>{title}</h1>\n\n")
+            f.write("        <div>Links:</div>\n        <ul>\n")
+            for link in sorted(links):
+                name = link[:-len(".html")]
+                f.write(f'            <li><a href="{link}">{name}</a></li>\n')
+            f.write("        </ul>\n    </body>\n</html>\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import os
+import struct
+import sys
+
+import numpy as np
+
+# Header: magic, version, bytes per target, pages, links, and the
+# positions of the targets, offsets and names, and the names' length
+MAGIC = b"PRGRAPH\0"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQQQQQQ")
+HEADER_SIZE = 64
+
+# Links read at a time when streaming over a graph file
+BLOCK_SIZE = 1 << 22
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python graphfile.py graph")
+    graph = LinkGraphFile(sys.argv[1])
+    print(f"{len(graph)} pages, {graph.links} links, "
+          f"{os.path.getsize(sys.argv[1]):,} bytes")
+
+
+class GraphWriter():
+    """
+    Writes a graph file one page at a time, so that only the offsets,
+    and not the links, are held in memory.
+
+    The file holds a header, then each page's link targets as page
+    numbers, then the offsets of each page's targets (in compressed
+    sparse row form, as in LinkGraph), then the page names, one per line.
+    Pages are numbered in the order given, which should be sorted.
+    """
+
+    def __init__(self, path, pages):
+        self.path = path
+        self.pages = pages
+        self.dtype = np.int32 if len(pages) < 2 ** 31 else np.int64
+        self.offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        self.count = 0
+        self.file = open(path, "wb")
+        self.file.write(bytes(HEADER_SIZE))
+
+    def add(self, targets):
+        """
+        Write the page numbers that the next page links to.
+        """
+        targets = np.asarray(sorted(targets), dtype=self.dtype)
+        self.file.write(targets.tobytes())
+        self.count += 1
+        self.offsets[self.count] = self.offsets[self.count - 1] + len(targets)
+
+    def close(self):
+        """
+        Write the offsets, names and header, and close the file.
+        """
+        if self.count != len(self.pages):
+            raise ValueError(f"{self.count} of {len(self.pages)} pages written")
+        f = self.file
+        targets_position = HEADER_SIZE
+        offsets_position = align(f.tell())
+        f.write(bytes(offsets_position - f.tell()))
+        f.write(self.offsets.tobytes())
+        names_position = f.tell()
+        names = "\n".join(self.pages).encode()
+        f.write(names)
+        f.seek(0)
+        f.write(HEADER.pack(
+            MAGIC, VERSION, np.dtype(self.dtype).itemsize,
+            len(self.pages), int(self.offsets[-1]),
+            targets_position, offsets_position, names_position, len(names)
+        ))
+        f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        if kind is None:
+            self.close()
+        else:
+            self.file.close()
+
+
+def align(position, to=8):
+    return -(-position // to) * to
+
+
+def write_graph(path, corpus):
+    """
+    Write the links of `corpus`, a dictionary from page to the set of
+    pages it links to, as a graph file at `path`. Links to pages outside
+    the corpus, and from a page to itself, are left out.
+    """
+    pages = sorted(corpus)
+    index = {page: i for i, page in enumerate(pages)}
+    with GraphWriter(path, pages) as writer:
+        for page in pages:
+            writer.add(index[link] for link in corpus[page]
+                       if link in index and link != page)
+
+
+class LinkGraphFile():
+    """
+    Links of a corpus, in the same form as a LinkGraph, read from a graph
+    file through memory maps. Only the parts in use are read from disk.
+
+    Page names are only loaded when `pages` or `index` are first used,
+    and dot reads about `block_size` links at a time.
+    """
+
+    def __init__(self, path, block_size=BLOCK_SIZE):
+        self.path = path
+        self.block_size = block_size
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+        (magic, version, itemsize, n, links, targets_position,
+         offsets_position, self.names_position,
+         self.names_length) = HEADER.unpack_from(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a graph file")
+        self.n = n
+        self.links = links
+        dtype = np.int32 if itemsize == 4 else np.int64
+        if links:
+            self.targets = np.memmap(path, dtype=dtype, mode="r",
+                                     offset=targets_position, shape=(links,))
+        else:
+            self.targets = np.zeros(0, dtype=dtype)
+        self.offsets = np.memmap(path, dtype=np.int64, mode="r",
+                                 offset=offsets_position, shape=(n + 1,))
+        self.outdegree = np.diff(self.offsets)
+        self.dangling = self.outdegree == 0
+        self._pages = None
+        self._index = None
+
+    def __len__(self):
+        return self.n
+
+    def __reduce__(self):
+        # reopen the file, rather than copy the memory maps
+        return (LinkGraphFile, (self.path, self.block_size))
+
+    @property
+    def pages(self):
+        if self._pages is None:
+            with open(self.path, "rb") as f:
+                f.seek(self.names_position)
+                names = f.read(self.names_length).decode()
+            self._pages = names.split("\n") if self.n else []
+        return self._pages
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {page: i for i, page in enumerate(self.pages)}
+        return self._index
+
+    def blocks(self):
+        """
+        Yield tuples (start, end, targets) covering every page in order,
+        where pages start to end - 1 link to `targets`, which holds about
+        `block_size` links at most (unless one page has more).
+        """
+        n = len(self)
+        block_size = self.block_size
+        start = 0
+        while start < n:
+            limit = self.offsets[start] + block_size
+            end = int(np.searchsorted(self.offsets, limit, side="right")) - 1
+            end = min(max(end, start + 1), n)
+            targets = np.asarray(
+                self.targets[self.offsets[start]:self.offsets[end]])
+            yield start, end, targets
+            start = end
+
+    def dot(self, x):
+        """
+        Return the product of the graph's link matrix and a vector, as
+        LinkMatrix.dot does, reading the links a block at a time.
+
+        Each block adds into only the entries it links to, so a product
+        costs time in proportion to the links, however many blocks.
+        """
+        result = np.zeros(len(self))
+        for start, end, targets in self.blocks():
+            degree = self.outdegree[start:end]
+            shares = x[start:end] / np.maximum(degree, 1)
+            np.add.at(result, targets, np.repeat(shares, degree))
+        return result
+
+
+if __name__ == "__main__":
+    main()
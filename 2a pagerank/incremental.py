@@ -0,0 +1,286 @@
+import heapq
+
+import numpy as np
+
+from sparse import TOLERANCE, LinkGraph, power_iterate
+
+# Largest residual, as a multiple of the tolerance, worth pushing
+PUSH_LIMIT = 10
+# Most pushes, as a share of the number of pages, before giving up on
+# pushing and leaving it all to power iteration
+PUSH_SHARE = 0.05
+
+
+class MutableLinkMatrix():
+    """
+    Link matrix of a corpus whose links can be added and removed in place.
+
+    Offers the same dot and dangling as a LinkMatrix, so power_iterate
+    works on it, but stores one (source, target) pair per link in arrays
+    with room to grow. A removed link is overwritten by the last one.
+
+    The arrays are filled in one pass from a LinkGraph. The set of links
+    of a page, and the slot of each link in the arrays, are only made
+    when first needed, so setting up costs about as much as the
+    LinkMatrix of a full recompute.
+    """
+
+    def __init__(self, corpus):
+        graph = LinkGraph(corpus)
+        self.pages = graph.pages
+        self.index = graph.index
+        n = len(self.pages)
+
+        # every link as a (source, target) pair, without links to itself
+        sources = np.repeat(np.arange(n, dtype=np.int64), graph.outdegree)
+        keep = sources != graph.targets
+        sources, targets = sources[keep], graph.targets[keep]
+        self.outdegree = np.bincount(sources, minlength=n).astype(np.int64)
+        self.dangling = self.outdegree == 0
+
+        self.size = len(sources)
+        self.sources = np.empty(max(16, 2 * self.size), dtype=np.int64)
+        self.targets = np.empty_like(self.sources)
+        self.sources[:self.size] = sources
+        self.targets[:self.size] = targets
+
+        # links as first given, one slice per page, for pages not yet changed
+        self.first_targets = targets
+        self.first_offsets = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(self.outdegree, out=self.first_offsets[1:])
+        self.changed = dict()
+        self.position = None
+
+    def __len__(self):
+        return len(self.pages)
+
+    def links(self, i):
+        """
+        Return the set of page numbers that page number i links to.
+        """
+        links = self.changed.get(i)
+        if links is None:
+            start, end = self.first_offsets[i], self.first_offsets[i + 1]
+            links = set(self.first_targets[start:end].tolist())
+            self.changed[i] = links
+        return links
+
+    def slot(self, i, j):
+        """
+        Return the position in the arrays of the link from i to j, first
+        indexing every link's position if that has not been done yet.
+        """
+        n = len(self)
+        if self.position is None:
+            keys = self.sources[:self.size] * n + self.targets[:self.size]
+            self.position = dict(zip(keys.tolist(), range(self.size)))
+        return self.position[i * n + j]
+
+    def append(self, i, j):
+        if self.size == len(self.sources):
+            self.sources = np.resize(self.sources, 2 * self.size)
+            self.targets = np.resize(self.targets, 2 * self.size)
+        self.sources[self.size] = i
+        self.targets[self.size] = j
+        if self.position is not None:
+            self.position[i * len(self) + j] = self.size
+        self.size += 1
+
+    def add_link(self, i, j):
+        """
+        Add a link from page number i to page number j.
+        Return False if the link was already there.
+        """
+        links = self.links(i)
+        if i == j or j in links:
+            return False
+        links.add(j)
+        self.outdegree[i] += 1
+        self.dangling[i] = False
+        self.append(i, j)
+        return True
+
+    def remove_link(self, i, j):
+        """
+        Remove the link from page number i to page number j.
+        Return False if there was no such link.
+        """
+        links = self.links(i)
+        if j not in links:
+            return False
+        links.remove(j)
+        self.outdegree[i] -= 1
+        self.dangling[i] = self.outdegree[i] == 0
+
+        slot = self.slot(i, j)
+        del self.position[i * len(self) + j]
+        self.size -= 1
+        if slot != self.size:
+            last = (int(self.sources[self.size]), int(self.targets[self.size]))
+            self.sources[slot], self.targets[slot] = last
+            self.position[last[0] * len(self) + last[1]] = slot
+        return True
+
+    def dot(self, x):
+        """
+        Return the product of the link matrix and a vector.
+        """
+        sources = self.sources[:self.size]
+        weights = x[sources] / self.outdegree[sources]
+        return np.bincount(self.targets[:self.size], weights=weights,
+                           minlength=len(self))
+
+
+class IncrementalPageRank():
+    """
+    PageRank values of a corpus, kept up to date as links change.
+
+    PageRank solves x = M x + (1 - d) / N, where column i of M passes
+    d * x[i] evenly along page i's links, or over every page if it has
+    none. After a change, the residual (1 - d) / N + M x - x is nonzero
+    only near the changed pages, and is pushed out from there: adding a
+    residual r to x[i] moves d * r / (links of i) of residual to each
+    page that i links to. Residual from dangling pages reaches every page
+    equally, so it is kept as one shared offset, which is settled at the
+    end by scaling the ranks, since (I - M) x = (1 - d) / N.
+
+    Power iteration from the pushed ranks then checks the result, taking
+    one step when pushing has done its job, and more when it has not.
+    """
+
+    def __init__(self, corpus, damping_factor, ranks=None,
+                 tolerance=TOLERANCE):
+        """
+        Set up the link structure of `corpus`. If `ranks` are given,
+        as a dictionary from page to PageRank, they are taken as already
+        computed; otherwise they are computed by power iteration.
+        """
+        self.matrix = MutableLinkMatrix(corpus)
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        if ranks is None:
+            self.ranks, _ = power_iterate(self.matrix, damping_factor,
+                                          tolerance)
+        else:
+            self.ranks = np.array([ranks[page] for page in self.matrix.pages],
+                                  dtype=np.float64)
+
+    def pagerank(self):
+        """
+        Return a dictionary mapping each page name to its PageRank value.
+        """
+        return dict(zip(self.matrix.pages, self.ranks.tolist()))
+
+    def update(self, added=(), removed=(), stats=None):
+        """
+        Add and remove links, each given as a (page, link) pair of page
+        names, and bring the PageRank values up to date. Both pages must
+        already be in the corpus.
+
+        If `stats` is a dictionary, it is filled with the number of pushes
+        and power iterations taken, and whether pushing gave up.
+        """
+        matrix = self.matrix
+        d = self.damping_factor
+        n = len(matrix)
+        x = self.ranks
+        residual = dict()
+        offset = 0.0
+
+        def column(i):
+            """Spread of d * x[i] over pages: (targets, share), or None."""
+            if matrix.dangling[i]:
+                return None
+            return matrix.links(i), d / matrix.outdegree[i]
+
+        def apply(i, amount, spread):
+            """Add `amount` times column `spread` of M to the residual."""
+            nonlocal offset
+            if spread is None:
+                offset += amount * d / n
+                return
+            targets, share = spread
+            for j in targets:
+                residual[j] = residual.get(j, 0.0) + amount * share
+
+        changes = [(page, link, True) for page, link in added]
+        changes += [(page, link, False) for page, link in removed]
+        changed = 0
+        for page, link, add in changes:
+            if page not in matrix.index or link not in matrix.index:
+                raise ValueError(f"{page} -> {link}: both pages must be "
+                                 f"in the corpus")
+            i, j = matrix.index[page], matrix.index[link]
+            before = column(i)
+            if before is not None:
+                before = (list(before[0]), before[1])
+            done = matrix.add_link(i, j) if add else matrix.remove_link(i, j)
+            if done:
+                # swap column i of M, weighted by x[i], in the residual
+                apply(i, -x[i], before)
+                apply(i, x[i], column(i))
+                changed += 1
+
+        # push residual out from the changed pages, largest first, until
+        # what is left is below tolerance, if there is little enough of it
+        # for that to stay local
+        mass = sum(abs(r) for r in residual.values())
+        target = self.tolerance * (1 - d) / 2
+        pushes = 0
+        pushed = dict()
+        heap = []
+        if mass <= PUSH_LIMIT * self.tolerance:
+            heap = [(-abs(r), j) for j, r in residual.items()]
+            heapq.heapify(heap)
+        while heap and mass > target and pushes < PUSH_SHARE * n:
+            _, i = heapq.heappop(heap)
+            r = residual.pop(i, 0.0)
+            if r == 0:
+                # already pushed since it was queued
+                continue
+            mass -= abs(r)
+            pushed.setdefault(i, x[i])
+            x[i] += r
+            pushes += 1
+            spread = column(i)
+            if spread is None:
+                offset += r * d / n
+                continue
+            targets, share = spread
+            for j in targets:
+                before = residual.get(j, 0.0)
+                after = before + r * share
+                residual[j] = after
+                mass += abs(after) - abs(before)
+                heapq.heappush(heap, (-abs(after), j))
+
+        gave_up = bool(pushed) and mass > target
+        if gave_up:
+            # too far to push: undo, and start iterating from the old ranks
+            for i, rank in pushed.items():
+                x[i] = rank
+        elif pushes:
+            # the residual left is below tolerance, apart from the offset
+            x *= 1 + offset * n / (1 - d)
+        self.ranks, iterations = power_iterate(matrix, d, self.tolerance,
+                                               start=x)
+
+        if stats is not None:
+            stats["pushes"] = pushes
+            stats["iterations"] = iterations
+            stats["gave_up"] = gave_up
+        return self.pagerank()
+
+
+def update_pagerank(corpus, ranks, damping_factor, added=(), removed=(),
+                    tolerance=TOLERANCE):
+    """
+    Return PageRank values for `corpus` after adding and removing links,
+    starting from `ranks`, its PageRank values before the change.
+
+    Setting up the link structure of `corpus` takes about as long as a
+    full recompute, so this is no faster than sparse.iterate_pagerank
+    for a single change; keep an IncrementalPageRank to update for less.
+    """
+    state = IncrementalPageRank(corpus, damping_factor, ranks, tolerance)
+    return state.update(added, removed)
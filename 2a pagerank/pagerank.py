@@ -2,15 +2,30 @@ import os
 import random
 import re
 import sys
+import time
+
+import sampler
+import sparse
+from graphfile import LinkGraphFile
 
 DAMPING = 0.85
 SAMPLES = 10000
+TOLERANCE = 1e-8
+
+# Update orders for iterate_pagerank
+JACOBI = "jacobi"
+GAUSS_SEIDEL = "gauss-seidel"
+# Sweeps between extrapolations, when iterate_pagerank extrapolates
+EXTRAPOLATION_INTERVAL = 10
 
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    if os.path.isfile(sys.argv[1]):
+        corpus = LinkGraphFile(sys.argv[1])
+    else:
+        corpus = crawl(sys.argv[1])
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -85,6 +100,10 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if isinstance(corpus, LinkGraphFile):
+        # links on disk: sample straight from the memory-mapped arrays
+        return sampler.sample_pagerank(corpus, damping_factor, n)
+
     counts = {page: 0 for page in corpus}  # to record page counts
 
     current = random.choices(list(corpus))[0]  # current page
@@ -103,55 +122,132 @@ def sample_pagerank(corpus, damping_factor, n):
     return {page: count/n for page, count in counts.items()}
 
 
-def iterate_pagerank(corpus0, damping_factor):
+def iterate_pagerank(corpus0, damping_factor, tolerance=TOLERANCE,
+                     method=JACOBI, extrapolate=False, freeze=False,
+                     callback=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
 
+    Iteration stops once a sweep over the pages changes them by less than
+    `tolerance` in total (the L1 norm of the change). With `method`
+    JACOBI each sweep uses the values from the sweep before; with
+    GAUSS_SEIDEL it uses each new value as soon as it is computed.
+    If `extrapolate` is true, every EXTRAPOLATION_INTERVAL sweeps each
+    value jumps ahead to the limit of its last three values (Aitken's
+    delta-squared process). If `freeze` is true, a page whose value
+    changes by less than tolerance / (number of pages) in two sweeps
+    running is taken as converged, and no longer updated.
+
+    If `callback` is given, it is called after each sweep with the
+    sweep's number, its total change and the seconds it took.
+
+    `corpus0` may also be a LinkGraphFile, which is iterated by
+    sparse.iterate_pagerank; the other options are not available for it.
+
     Return a dictionary where keys are page names, and values are
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
+    if isinstance(corpus0, LinkGraphFile):
+        # links on disk: iterate over the memory-mapped arrays in blocks
+        if method != JACOBI or extrapolate or freeze or callback is not None:
+            raise ValueError("a graph file can only be iterated with the "
+                             "default method and options")
+        return sparse.iterate_pagerank(corpus0, damping_factor, tolerance)
+    if method not in (JACOBI, GAUSS_SEIDEL):
+        raise ValueError(f"unknown method: {method}")
     corpus_size = len(corpus0)
+    pages = sorted(corpus0)
 
-    all_pages = set(corpus0)
     # • A page that has no links at all should be interpreted as having one link for every page in the corpus (including itself).
-    corpus = {page: links if len(links) > 0 else all_pages
-              for page, links in corpus0.items()
-              }
+    # Their PageRank is shared out evenly, rather than listed as a link
+    # to every page.
+    dangling = {page for page in pages if len(corpus0[page]) == 0}
 
-    pages_that_link_to_me = {
-        me: [page for page, links in corpus.items() if me in links]
-        for me in corpus
-    }
-    numlinks = {page: len(links) for page, links in corpus.items()}
+    pages_that_link_to_me = {me: [] for me in pages}
+    for page, links in corpus0.items():
+        for link in links:
+            if link in pages_that_link_to_me:
+                pages_that_link_to_me[link].append(page)
+    numlinks = {page: len(links) for page, links in corpus0.items()}
 
-    pageranks = {page: 1/corpus_size for page in corpus}
+    pageranks = {page: 1/corpus_size for page in pages}
 
     # iterative algorithm
     d = damping_factor
     first_term = (1-d)/corpus_size
-    pr = pageranks
-    count_consecutive_updates_within_threshold = 0
-    while count_consecutive_updates_within_threshold < corpus_size:
-        for p in corpus:
+    active = pages
+    calm = set()
+    history = []
+    iteration = 0
+    while True:
+        start = time.perf_counter()
+        iteration += 1
+        # Jacobi reads from the last sweep's values, Gauss-Seidel in place
+        previous = dict(pageranks)
+        pr = pageranks if method == GAUSS_SEIDEL else previous
+        dangling_term = d * sum(pr[page] for page in dangling) / corpus_size
+        for p in active:
             new_pagerank = (
-                first_term +
+                first_term + dangling_term +
                 d * sum(pr[i]/numlinks[i]
                         for i in pages_that_link_to_me[p]
                         )
             )
-            if abs(pageranks[p] - new_pagerank) < 0.0001:
-                # increment whenever an update is within threshold
-                count_consecutive_updates_within_threshold += 1
-            else:
-                # reset whenever an update exceeds threshold
-                count_consecutive_updates_within_threshold = 0
+            if method == GAUSS_SEIDEL and p in dangling:
+                dangling_term += d * (new_pagerank - pr[p]) / corpus_size
             # update pagerank
             pageranks[p] = new_pagerank
 
+        # Gauss-Seidel does not keep the total at 1; scaling back stops the
+        # error in the total from decaying only as fast as d ** iteration
+        total = sum(pageranks.values())
+        for p in pages:
+            pageranks[p] /= total
+        residual = sum(abs(pageranks[p] - previous[p]) for p in pages)
+        if freeze:
+            # a page that crosses its limit can change little by chance,
+            # so it must change little twice running to be frozen
+            was_calm = calm
+            calm = {p for p in active
+                    if abs(pageranks[p] - previous[p]) < tolerance / corpus_size}
+            active = [p for p in active if p not in calm or p not in was_calm]
+
+        if extrapolate:
+            history = history[-2:] + [dict(pageranks)]
+            if iteration % EXTRAPOLATION_INTERVAL == 0:
+                aitken(pageranks, *history)
+
+        if callback is not None:
+            callback(iteration, residual, time.perf_counter() - start)
+        if residual < tolerance or not active:
+            break
+
     return pageranks
 
 
+def aitken(pageranks, x0, x1, x2):
+    """
+    Move each PageRank value in place to the limit of the geometric
+    sequence through its last three values x0, x1 and x2, then scale all
+    values to sum to 1.
+    """
+    for page in pageranks:
+        step1 = x1[page] - x0[page]
+        step2 = x2[page] - x1[page]
+        if step1 == 0:
+            continue
+        ratio = step2 / step1
+        if abs(ratio) < 1:
+            # steps shrink by `ratio` each time, so the rest add up to this
+            estimate = x2[page] + step2 * ratio / (1 - ratio)
+            if estimate > 0:
+                pageranks[page] = estimate
+    total = sum(pageranks.values())
+    for page in pageranks:
+        pageranks[page] /= total
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,161 @@
+import heapq
+import multiprocessing
+import os
+import sys
+from collections import deque
+
+import numpy as np
+
+from pagerank import DAMPING, crawl
+from sparse import LinkGraph
+
+# Residual per link left unpushed; smaller is more accurate and less local
+EPSILON = 1e-5
+TOP = 10
+
+
+def main():
+    if len(sys.argv) < 3:
+        sys.exit("Usage: python personalized.py corpus page [page ...]")
+    ranking = PersonalizedPageRank(crawl(sys.argv[1]), DAMPING)
+    seeds = sys.argv[2:]
+    print(f"Pages related to {', '.join(seeds)}")
+    for page, rank in ranking.top(seeds, TOP):
+        print(f"  {page}: {rank:.4f}")
+
+
+class PersonalizedPageRank():
+    """
+    Personalized PageRank over a corpus, by local push.
+
+    The random surfer of personalized PageRank jumps back to a set of
+    seed pages, instead of to any page at random, and so spends most of
+    its time near them. Pages with no links also send it back to the
+    seeds.
+    """
+
+    def __init__(self, corpus, damping_factor, epsilon=EPSILON):
+        graph = LinkGraph(corpus)
+        self.pages = graph.pages
+        self.index = graph.index
+        # plain lists, since pushing reads one entry at a time
+        self.offsets = graph.offsets.tolist()
+        self.targets = graph.targets.tolist()
+        self.damping_factor = damping_factor
+        self.epsilon = epsilon
+        # most residual a page may keep without being pushed
+        self.limits = (epsilon * np.maximum(graph.outdegree, 1)).tolist()
+
+    def push(self, seeds):
+        """
+        Return a tuple (estimates, residual) of dictionaries by page
+        number, for the page numbers in `seeds`, by forward push
+        (Andersen, Chung and Lang).
+
+        The surfer starts on a seed, with all of its probability as
+        residual. Pushing page u settles a share 1 - d of its residual as
+        u's estimate, and passes the rest evenly along u's links. Pages
+        are pushed while their residual exceeds epsilon times their
+        number of links, so only pages near the seeds are touched.
+        Estimates are never above the true values, and fall short of them
+        by the total residual left, at most.
+        """
+        d = self.damping_factor
+        offsets, targets, limits = self.offsets, self.targets, self.limits
+        estimates = dict()
+        residual = {s: 1 / len(seeds) for s in seeds}
+        queue = deque(seeds)
+        queued = set(seeds)
+
+        while queue:
+            u = queue.popleft()
+            queued.discard(u)
+            r = residual.pop(u)
+            estimates[u] = estimates.get(u, 0.0) + (1 - d) * r
+            start, end = offsets[u], offsets[u + 1]
+            if start == end:
+                # no links: back to the seeds
+                links, share = seeds, d * r / len(seeds)
+            else:
+                links, share = targets[start:end], d * r / (end - start)
+            for v in links:
+                rv = residual.get(v, 0.0) + share
+                residual[v] = rv
+                if rv > limits[v] and v not in queued:
+                    queue.append(v)
+                    queued.add(v)
+        return estimates, residual
+
+    def scores(self, seeds):
+        """
+        Return a dictionary mapping each page near the seed pages `seeds`
+        to its estimated personalized PageRank. Pages not included have
+        an estimate of 0.
+        """
+        seeds = self.seed_numbers(seeds)
+        estimates, _ = self.push(seeds)
+        return {self.pages[u]: estimate for u, estimate in estimates.items()}
+
+    def top(self, seeds, k, include_seeds=False):
+        """
+        Return a list of the `k` pages with the highest personalized
+        PageRank for the seed pages `seeds`, as (page, rank) pairs from
+        highest rank to lowest. Seed pages are left out unless
+        `include_seeds` is true.
+        """
+        seeds = self.seed_numbers(seeds)
+        estimates, _ = self.push(seeds)
+        if not include_seeds:
+            for s in seeds:
+                estimates.pop(s, None)
+        best = heapq.nlargest(k, estimates.items(), key=lambda item: item[1])
+        return [(self.pages[u], estimate) for u, estimate in best]
+
+    def top_batch(self, seed_sets, k, include_seeds=False, processes=1):
+        """
+        Return a list with the result of top for each seed set in
+        `seed_sets`, computed by a pool of `processes` workers if more
+        than one.
+        """
+        tasks = [(seeds, k, include_seeds) for seeds in seed_sets]
+        if processes == 1:
+            return [_top(self, task) for task in tasks]
+        processes = processes or os.cpu_count()
+        chunksize = max(1, len(tasks) // (processes * 4))
+        with multiprocessing.Pool(processes, initializer=_init_worker,
+                                  initargs=(self,)) as pool:
+            return pool.map(_top_task, tasks, chunksize)
+
+    def seed_numbers(self, seeds):
+        """
+        Return the list of page numbers of the seed pages `seeds`.
+        """
+        if isinstance(seeds, str):
+            seeds = [seeds]
+        seeds = sorted(set(seeds))
+        if not seeds:
+            raise ValueError("personalized PageRank needs a seed page")
+        for page in seeds:
+            if page not in self.index:
+                raise ValueError(f"{page} is not in the corpus")
+        return [self.index[page] for page in seeds]
+
+
+_worker = dict()
+
+
+def _init_worker(ranking):
+    _worker["ranking"] = ranking
+
+
+def _top(ranking, task):
+    seeds, k, include_seeds = task
+    return ranking.top(seeds, k, include_seeds)
+
+
+def _top_task(task):
+    return _top(_worker["ranking"], task)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import math
+import multiprocessing
+import os
+import random
+
+import numpy as np
+
+from graphfile import LinkGraphFile
+from sparse import LinkGraph
+
+# Visits held back before being added to the counts, in walker mode
+BUFFER_SIZE = 1 << 20
+
+# Batches of samples, each with its own random stream; enough to
+# estimate the spread between batches for the confidence intervals
+BATCHES = 32
+# Normal quantile for a two-sided 95% confidence interval
+Z = 1.96
+
+
+def walk(graph, damping_factor, n, rng):
+    """
+    Take `n` steps of one random surfer over a LinkGraph, starting on a
+    page at random. Return a list of visit counts by page number.
+
+    Each step costs O(1): a coin with probability `damping_factor` decides
+    whether to follow a link, chosen uniformly from the current page's
+    links, or to jump to a page chosen uniformly from the whole corpus.
+    A page without links always jumps.
+    """
+    pages = len(graph)
+    if isinstance(graph, LinkGraphFile):
+        # read single entries from the memory maps, rather than copy them
+        offsets, targets = graph.offsets, graph.targets
+    else:
+        offsets, targets = graph.offsets.tolist(), graph.targets.tolist()
+    counts = [0] * pages
+
+    current = rng.randrange(pages)
+    counts[current] += 1
+    for _ in range(n - 1):
+        start = offsets[current]
+        links = offsets[current + 1] - start
+        if links == 0 or rng.random() >= damping_factor:
+            current = rng.randrange(pages)
+        else:
+            current = targets[start + int(rng.random() * links)]
+        counts[current] += 1
+    return counts
+
+
+def walk_vectorized(graph, damping_factor, n, walkers, rng):
+    """
+    Advance `walkers` independent random surfers together with NumPy,
+    for at least `n` visits in total, each surfer starting on a page at
+    random. Return an array of visit counts by page number.
+
+    A surfer's walk is a series of runs, each starting on a page at
+    random after a jump. Once a surfer has used its share of the steps,
+    it finishes its current run and stops at the next jump. Cutting a
+    run short would count too few visits to pages found late in runs,
+    which matters when each surfer takes only a few steps.
+    """
+    pages = len(graph)
+    steps = -(-n // walkers)
+    counts = np.zeros(pages, dtype=np.int64)
+    buffered = []
+    buffered_size = 0
+
+    positions = rng.integers(pages, size=walkers)
+    step = 0
+    while len(positions) > 0:
+        if step > 0:
+            degree = graph.outdegree[positions]
+            follow = (rng.random(len(positions)) < damping_factor) & (degree > 0)
+            if step >= steps:
+                # past the budget, surfers stop instead of jumping
+                positions = positions[follow]
+                degree = degree[follow]
+                follow = np.ones(len(positions), dtype=bool)
+            new_positions = rng.integers(pages, size=len(positions))
+            chosen = (graph.offsets[positions[follow]]
+                      + (rng.random(follow.sum()) * degree[follow]).astype(np.int64))
+            new_positions[follow] = graph.targets[chosen]
+            positions = new_positions
+        step += 1
+
+        # count visits in batches, since each count touches every page
+        buffered.append(positions)
+        buffered_size += len(positions)
+        if buffered_size >= max(pages, BUFFER_SIZE):
+            counts += np.bincount(np.concatenate(buffered), minlength=pages)
+            buffered = []
+            buffered_size = 0
+    if buffered:
+        counts += np.bincount(np.concatenate(buffered), minlength=pages)
+    return counts
+
+
+def sample_pagerank(corpus, damping_factor, n, walkers=1, seed=None):
+    """
+    Return PageRank values for each page by sampling `n` pages with
+    random surfers, each starting with a page at random.
+
+    The corpus's links are laid out once in a LinkGraph, so each step
+    costs O(1) instead of building a transition model. With more than
+    one walker, the surfers move together in NumPy arrays, and at least
+    `n` pages are sampled in total.
+
+    `corpus` may also be a LinkGraphFile, whose links are then read from
+    disk as the surfers need them.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = corpus if isinstance(corpus, LinkGraphFile) else LinkGraph(corpus)
+    if walkers == 1:
+        counts = walk(graph, damping_factor, n, random.Random(seed))
+    else:
+        counts = walk_vectorized(graph, damping_factor, n, walkers,
+                                 np.random.default_rng(seed))
+        counts = counts.tolist()
+    total = sum(counts)
+    return {page: count / total for page, count in zip(graph.pages, counts)}
+
+
+_worker = dict()
+
+
+def _init_worker(graph, damping_factor):
+    _worker["graph"] = graph
+    _worker["damping_factor"] = damping_factor
+
+
+def _sample_batch(task):
+    """
+    Sample one batch of pages with its own random stream.
+    Return an array of visit counts by page number.
+    """
+    n, walkers, seed = task
+    graph = _worker["graph"]
+    damping_factor = _worker["damping_factor"]
+    if walkers == 1:
+        rng = random.Random(int(seed.generate_state(1, np.uint64)[0]))
+        return np.array(walk(graph, damping_factor, n, rng), dtype=np.int64)
+    return walk_vectorized(graph, damping_factor, n, walkers,
+                           np.random.default_rng(seed))
+
+
+def merge_counts(batches):
+    """
+    Add up the visit counts of several batches of samples.
+    """
+    return np.sum(batches, axis=0)
+
+
+def confidence_intervals(batches, z=Z):
+    """
+    Return, for each page number, the half-width of a confidence interval
+    for its PageRank, from the visit counts of independent batches.
+
+    Visits along one walk are not independent, so the spread is measured
+    between the estimates of separate batches (batch means) rather than
+    between single visits.
+    """
+    batches = np.asarray(batches, dtype=np.float64)
+    if len(batches) < 2:
+        raise ValueError("confidence intervals need at least two batches")
+    estimates = batches / batches.sum(axis=1, keepdims=True)
+    spread = estimates.std(axis=0, ddof=1)
+    return z * spread / math.sqrt(len(batches))
+
+
+def samples_needed(intervals, n, target):
+    """
+    Return the number of samples expected to shrink the widest of
+    `intervals`, measured with `n` samples, to a half-width of `target`.
+    Interval widths shrink with the square root of the sample count.
+    """
+    widest = max(intervals)
+    return max(1, math.ceil(n * (widest / target) ** 2))
+
+
+def parallel_sample_pagerank(corpus, damping_factor, n, processes=None,
+                             batches=BATCHES, walkers=1, seed=None, z=Z):
+    """
+    Sample PageRank values with a pool of `processes` workers.
+
+    The `n` samples are split into `batches`, each sampled with `walkers`
+    surfers and its own random stream, spawned from `seed`, so results
+    do not depend on the number of processes. Each worker receives the
+    corpus's LinkGraph once, and the batches' visit counts are merged.
+
+    Return a tuple (ranks, intervals) of dictionaries mapping each page
+    name to its estimated PageRank value, and to the half-width of a
+    confidence interval around it.
+    """
+    processes = processes or os.cpu_count()
+    graph = corpus if isinstance(corpus, LinkGraphFile) else LinkGraph(corpus)
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+    sizes = [n // batches + (b < n % batches) for b in range(batches)]
+    tasks = [(size, walkers, seed) for size, seed in zip(sizes, seeds)]
+
+    with multiprocessing.Pool(processes, initializer=_init_worker,
+                              initargs=(graph, damping_factor)) as pool:
+        counts = pool.map(_sample_batch, tasks)
+
+    total = merge_counts(counts)
+    ranks = total / total.sum()
+    widths = confidence_intervals(counts, z)
+    return (
+        dict(zip(graph.pages, ranks.tolist())),
+        dict(zip(graph.pages, widths.tolist()))
+    )
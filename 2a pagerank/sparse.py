@@ -0,0 +1,128 @@
+import numpy as np
+
+from graphfile import LinkGraphFile
+
+TOLERANCE = 1e-8
+MAX_ITERATIONS = 1000
+
+
+class LinkGraph():
+    """
+    Links of a corpus in compressed sparse row form, by linking page.
+
+    Pages are numbered in sorted order. The pages linked to by page i are
+    targets[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, corpus):
+        self.pages = sorted(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        n = len(self.pages)
+
+        self.offsets = np.zeros(n + 1, dtype=np.int64)
+        targets = []
+        for i, page in enumerate(self.pages):
+            links = sorted(self.index[link] for link in corpus[page]
+                           if link in self.index)
+            targets.extend(links)
+            self.offsets[i + 1] = len(targets)
+        self.targets = np.array(targets, dtype=np.int64)
+        self.outdegree = np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.pages)
+
+
+class LinkMatrix():
+    """
+    Column-stochastic link matrix of a corpus, stored in CSR form.
+
+    Pages are numbered in sorted order. Row j holds one entry for each
+    page i that links to page j, with value 1 / (number of links on i),
+    so that multiplying by a rank vector passes each page's rank evenly
+    along its links. Pages with no links (dangling pages) have empty
+    columns; their rank is spread over every page separately.
+    """
+
+    def __init__(self, corpus):
+        self.pages = sorted(corpus)
+        self.index = {page: i for i, page in enumerate(self.pages)}
+        n = len(self.pages)
+
+        sources = []
+        targets = []
+        for page, links in corpus.items():
+            i = self.index[page]
+            for link in links:
+                j = self.index.get(link)
+                if j is not None:
+                    sources.append(i)
+                    targets.append(j)
+        sources = np.array(sources, dtype=np.int64)
+        targets = np.array(targets, dtype=np.int64)
+
+        outdegree = np.bincount(sources, minlength=n)
+        order = np.argsort(targets, kind="stable")
+        self.indices = sources[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(targets, minlength=n), out=self.indptr[1:])
+        self.data = 1 / outdegree[self.indices]
+        self.dangling = outdegree == 0
+
+        # row of each stored entry, so rows can be summed in one call
+        self.rows = np.repeat(np.arange(n), np.diff(self.indptr))
+
+    def __len__(self):
+        return len(self.pages)
+
+    def dot(self, x):
+        """
+        Return the product of the link matrix and a vector.
+        """
+        return np.bincount(self.rows, weights=self.data * x[self.indices],
+                           minlength=len(self))
+
+
+def power_iterate(matrix, damping_factor, tolerance=TOLERANCE,
+                  max_iterations=MAX_ITERATIONS, start=None):
+    """
+    Return the PageRank vector of a LinkMatrix by power iteration, and
+    the number of iterations taken.
+
+    The rank held by dangling pages is spread evenly over all pages, a
+    rank-one correction to the matrix. Iteration starts from `start`, if
+    given, or else from equal ranks, and stops once the L1 norm of the
+    change in ranks falls below `tolerance`.
+    """
+    n = len(matrix)
+    ranks = np.full(n, 1 / n) if start is None else start
+    teleport = (1 - damping_factor) / n
+    for iteration in range(1, max_iterations + 1):
+        dangling_rank = ranks[matrix.dangling].sum()
+        new_ranks = (damping_factor * (matrix.dot(ranks) + dangling_rank / n)
+                     + teleport)
+        residual = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        if residual < tolerance:
+            break
+    return ranks, iteration
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE):
+    """
+    Return PageRank values for each page, computed by power iteration
+    over a sparse link matrix.
+
+    `corpus` may also be a LinkGraphFile, whose links are then read from
+    disk a block at a time on each iteration.
+
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    if isinstance(corpus, LinkGraphFile):
+        matrix = corpus
+    else:
+        matrix = LinkMatrix(corpus)
+    ranks, _ = power_iterate(matrix, damping_factor, tolerance)
+    return dict(zip(matrix.pages, ranks.tolist()))
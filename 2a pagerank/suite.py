@@ -0,0 +1,182 @@
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import generator
+import graphfile
+import pagerank
+import sampler
+import sparse
+
+# Corpus sizes, in pages, and the number of separate groups in each
+SCALES = [100, 1000, 10000]
+COMPONENTS = 4
+
+# Largest corpus to run the original, O(N) per step, sampler on
+SLOW_SAMPLER_LIMIT = 1000
+WALKERS = 1000
+
+# Ranks are compared to power iteration run to this tolerance
+REFERENCE_TOLERANCE = 1e-12
+# Largest difference from the reference that counts as agreeing
+ITERATE_AGREEMENT = 1e-6
+SAMPLE_AGREEMENT = 0.02
+TOP = 10
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python suite.py baseline.json")
+    results = run_suite()
+    with open(sys.argv[1], "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {sys.argv[1]}")
+
+
+def timed(function):
+    """
+    Call `function` once. Return its result and the time taken in seconds.
+    """
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def agreement(ranks, expected):
+    """
+    Compare PageRank values to the expected values. Return a dictionary
+    with the largest difference for any page, the total difference, and
+    the share of the expected top pages that are also in the top.
+    """
+    def top(values):
+        return set(sorted(values, key=values.get, reverse=True)[:TOP])
+
+    differences = [abs(ranks[page] - expected[page]) for page in expected]
+    overlap = len(top(ranks) & top(expected))
+    return {
+        "max_difference": max(differences),
+        "total_difference": sum(differences),
+        "top_overlap": overlap / min(TOP, len(expected))
+    }
+
+
+def run_suite(scales=SCALES):
+    """
+    Generate a corpus at each scale, time each engine on it, and compare
+    their ranks. Return the results as a dictionary.
+    """
+    results = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "components": COMPONENTS,
+        "scales": []
+    }
+    for n in scales:
+        corpus = generator.generate_corpus(n, COMPONENTS, seed=n)
+        links = sum(len(links) for links in corpus.values())
+        print(f"{n} pages, {links} links")
+        scale = {"pages": n, "links": links, "crawl": [], "rank": []}
+        results["scales"].append(scale)
+
+        with tempfile.TemporaryDirectory() as directory:
+            pages = os.path.join(directory, "pages")
+            os.mkdir(pages)
+            generator.write_corpus(corpus, pages)
+            path = os.path.join(directory, "graph.bin")
+
+            crawls = [
+                ("pagerank.crawl", lambda: pagerank.crawl(pages)),
+                ("crawler.crawl", lambda: crawler.crawl(pages)),
+                ("crawler.crawl to graph file",
+                 lambda: crawler.crawl(pages, output=path))
+            ]
+            for name, crawl in crawls:
+                crawled, seconds = timed(crawl)
+                if not isinstance(crawled, dict):
+                    crawled = {
+                        page: {crawled.pages[j] for j in crawled.targets[
+                            crawled.offsets[i]:crawled.offsets[i + 1]]}
+                        for i, page in enumerate(crawled.pages)
+                    }
+                record(scale["crawl"], name, seconds, n,
+                       agrees=crawled == corpus)
+
+            graph = graphfile.LinkGraphFile(path)
+            expected = sparse.iterate_pagerank(
+                corpus, pagerank.DAMPING, REFERENCE_TOLERANCE)
+            for name, engine, limit in engines(corpus, graph, n):
+                random.seed(0)
+                ranks, seconds = timed(engine)
+                compared = agreement(ranks, expected)
+                record(scale["rank"], name, seconds, n,
+                       agrees=compared["max_difference"] < limit, **compared)
+            del graph
+    return results
+
+
+def engines(corpus, graph, n):
+    """
+    Return a list of (name, function, limit) for each engine to run on
+    `corpus` of `n` pages, also written to `graph`, where `limit` is
+    the largest difference from the reference that agrees.
+    """
+    d = pagerank.DAMPING
+    samples = pagerank.SAMPLES
+    found = [
+        ("pagerank.iterate_pagerank",
+         lambda: pagerank.iterate_pagerank(corpus, d), ITERATE_AGREEMENT),
+        ("pagerank.iterate_pagerank, Gauss-Seidel",
+         lambda: pagerank.iterate_pagerank(
+             corpus, d, method=pagerank.GAUSS_SEIDEL), ITERATE_AGREEMENT),
+        ("sparse.iterate_pagerank",
+         lambda: sparse.iterate_pagerank(corpus, d), ITERATE_AGREEMENT),
+        ("sparse.iterate_pagerank, graph file",
+         lambda: sparse.iterate_pagerank(graph, d), ITERATE_AGREEMENT),
+    ]
+    if n <= SLOW_SAMPLER_LIMIT:
+        found.append((
+            "pagerank.sample_pagerank",
+            lambda: pagerank.sample_pagerank(corpus, d, samples),
+            SAMPLE_AGREEMENT
+        ))
+    found += [
+        ("sampler.sample_pagerank",
+         lambda: sampler.sample_pagerank(corpus, d, samples, seed=0),
+         SAMPLE_AGREEMENT),
+        (f"sampler.sample_pagerank, {WALKERS} walkers",
+         lambda: sampler.sample_pagerank(corpus, d, samples, WALKERS, seed=0),
+         SAMPLE_AGREEMENT),
+        ("sampler.sample_pagerank, graph file",
+         lambda: sampler.sample_pagerank(graph, d, samples, WALKERS, seed=0),
+         SAMPLE_AGREEMENT)
+    ]
+    return found
+
+
+def record(results, name, seconds, pages, agrees, **fields):
+    """
+    Add one timing to `results`, and print it.
+    """
+    results.append({
+        "name": name,
+        "seconds": seconds,
+        "pages_per_second": pages / seconds if seconds else 0.0,
+        "agrees": agrees,
+        **fields
+    })
+    line = f"  {name}: {seconds * 1000:.1f} ms"
+    if "max_difference" in fields:
+        line += (f", max difference {fields['max_difference']:.2e}, "
+                 f"top {TOP} overlap {fields['top_overlap']:.0%}")
+    print(line + ("" if agrees else " (DISAGREES)"))
+
+
+if __name__ == "__main__":
+    main()
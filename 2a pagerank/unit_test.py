@@ -1,4 +1,14 @@
+import os
+import tempfile
+
+import crawler
+import generator
+import graphfile
+import incremental
 import pagerank
+import personalized
+import sampler
+import sparse
 
 
 def test(function_name, test_arguments, expected = None):
@@ -9,6 +19,16 @@ def test(function_name, test_arguments, expected = None):
     if expected is not None:
         print("* pass" if result == expected else "! fail")
     print()
+    return result
+
+
+def test_close(name, result, expected, tolerance=0.001):
+    print(f"___{name}")
+    print(result)
+    close = all(abs(result[page] - expected[page]) < tolerance
+                for page in expected)
+    print("* pass" if close else "! fail")
+    print()
 
 CORPUS = {"1.html": {"2.html", "3.html"}, "2.html": {"3.html"}, "3.html": {"2.html"}}
 
@@ -22,4 +42,108 @@ test("transition_model", transition_model_test, transition_model_expected)
 
 test("sample_pagerank", [CORPUS, pagerank.DAMPING, pagerank.SAMPLES])
 
-test("iterate_pagerank", [CORPUS, pagerank.DAMPING])
\ No newline at end of file
+iterated = test("iterate_pagerank", [CORPUS, pagerank.DAMPING])
+
+for name, options in [
+    ("Gauss-Seidel", dict(method=pagerank.GAUSS_SEIDEL)),
+    ("extrapolated", dict(extrapolate=True)),
+    ("freezing", dict(freeze=True))
+]:
+    test_close(
+        f"iterate_pagerank ({name})",
+        pagerank.iterate_pagerank(CORPUS, pagerank.DAMPING, **options),
+        iterated
+    )
+
+test_close(
+    "sparse.iterate_pagerank",
+    sparse.iterate_pagerank(CORPUS, pagerank.DAMPING),
+    iterated
+)
+
+test_close(
+    "sampler.sample_pagerank",
+    sampler.sample_pagerank(CORPUS, pagerank.DAMPING, pagerank.SAMPLES, seed=0),
+    iterated,
+    tolerance=0.02
+)
+
+test_close(
+    "sampler.sample_pagerank (vectorized)",
+    sampler.sample_pagerank(CORPUS, pagerank.DAMPING, pagerank.SAMPLES,
+                            walkers=100, seed=0),
+    iterated,
+    tolerance=0.02
+)
+
+parallel_ranks, parallel_intervals = sampler.parallel_sample_pagerank(
+    CORPUS, pagerank.DAMPING, pagerank.SAMPLES, processes=2, seed=0)
+test_close(
+    "sampler.parallel_sample_pagerank",
+    parallel_ranks,
+    iterated,
+    tolerance=0.02
+)
+test_close(
+    "sampler.parallel_sample_pagerank (intervals)",
+    parallel_intervals,
+    {page: 0.01 for page in CORPUS},
+    tolerance=0.01
+)
+
+print("___crawler.crawl")
+with tempfile.TemporaryDirectory() as directory:
+    cache = os.path.join(directory, "links.json")
+    crawled = all(
+        crawler.crawl(corpus, cache) == pagerank.crawl(corpus)
+        for corpus in ["corpus0", "corpus1", "corpus2", "corpus2"]
+    )
+print("* pass" if crawled else "! fail")
+print()
+
+print("___generator.generate_corpus")
+generated = generator.generate_corpus(1000, components=4, seed=0)
+separate = all(int(page[:-5]) % 4 == int(link[:-5]) % 4
+               for page, links in generated.items() for link in links)
+dangling = sum(not links for links in generated.values())
+with tempfile.TemporaryDirectory() as directory:
+    generator.write_corpus(generated, directory)
+    written = pagerank.crawl(directory) == generated
+print(f"{len(generated)} pages, {dangling} dangling")
+print("* pass" if len(generated) == 1000 and separate and dangling and written
+      else "! fail")
+print()
+
+changed_corpus = {page: set(links) for page, links in CORPUS.items()}
+changed_corpus["2.html"] = {"1.html"}
+test_close(
+    "incremental.update_pagerank",
+    incremental.update_pagerank(CORPUS, iterated, pagerank.DAMPING,
+                                added=[("2.html", "1.html")],
+                                removed=[("2.html", "3.html")]),
+    sparse.iterate_pagerank(changed_corpus, pagerank.DAMPING)
+)
+
+test_close(
+    "personalized.PersonalizedPageRank",
+    personalized.PersonalizedPageRank(CORPUS, pagerank.DAMPING,
+                                      epsilon=1e-9).scores(["1.html"]),
+    {"1.html": 0.15, "2.html": 0.425, "3.html": 0.425}
+)
+
+with tempfile.TemporaryDirectory() as directory:
+    path = os.path.join(directory, "graph.bin")
+    graphfile.write_graph(path, CORPUS)
+    graph = graphfile.LinkGraphFile(path, block_size=2)
+    test_close(
+        "iterate_pagerank (graph file)",
+        pagerank.iterate_pagerank(graph, pagerank.DAMPING),
+        iterated
+    )
+    test_close(
+        "sample_pagerank (graph file)",
+        pagerank.sample_pagerank(graph, pagerank.DAMPING, pagerank.SAMPLES),
+        iterated,
+        tolerance=0.02
+    )
+    del graph
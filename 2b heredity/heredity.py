@@ -4,6 +4,8 @@ import sys
 from functools import reduce
 import operator
 
+import inference
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -46,6 +48,26 @@ def main():
         sys.exit("Usage: python heredity.py data.csv")
     people = load_data(sys.argv[1])
 
+    # Compute each person's gene and trait distributions
+    probabilities = inference.junction_tree(people, PROBS).calibrate(people)
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Return each person's gene and trait distributions, by adding up the
+    joint probability of every assignment of genes and traits.
+    Exponential in the size of the family; inference.marginals gives the
+    same distributions much faster.
+    """
     # Keep track of gene and trait probabilities for each person
     probabilities = {
         person: {
@@ -85,15 +107,7 @@ def main():
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
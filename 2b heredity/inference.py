@@ -0,0 +1,442 @@
+import heapq
+import itertools
+
+# Number of copies of the gene a person can have
+GENES = (0, 1, 2)
+
+
+class Factor():
+    """
+    A table of numbers over some people's number of genes.
+
+    `variables` is a tuple of names, and `table` maps each tuple of gene
+    counts, one per variable in the same order, to a number.
+    """
+
+    def __init__(self, variables, table):
+        self.variables = tuple(variables)
+        self.table = table
+
+    def multiply(self, other):
+        """
+        Return the product of this factor and `other`, over the variables
+        of both.
+        """
+        variables = self.variables + tuple(
+            v for v in other.variables if v not in self.variables)
+        mine = [variables.index(v) for v in self.variables]
+        theirs = [variables.index(v) for v in other.variables]
+        table = dict()
+        for values in itertools.product(GENES, repeat=len(variables)):
+            table[values] = (
+                self.table[tuple(values[i] for i in mine)] *
+                other.table[tuple(values[i] for i in theirs)]
+            )
+        return Factor(variables, table)
+
+    def sum_out(self, variable):
+        """
+        Return the factor left after summing over every value of `variable`.
+        """
+        position = self.variables.index(variable)
+        variables = self.variables[:position] + self.variables[position + 1:]
+        table = dict()
+        for values, p in self.table.items():
+            rest = values[:position] + values[position + 1:]
+            table[rest] = table.get(rest, 0) + p
+        return Factor(variables, table)
+
+    def project(self, variables):
+        """
+        Return the factor over `variables` left after summing out every
+        other variable.
+        """
+        factor = self
+        for v in self.variables:
+            if v not in variables:
+                factor = factor.sum_out(v)
+        return factor
+
+    def divide(self, other):
+        """
+        Return this factor divided by `other`, whose variables must all be
+        among this factor's, taking 0 / 0 as 0.
+        """
+        theirs = [self.variables.index(v) for v in other.variables]
+        table = dict()
+        for values, p in self.table.items():
+            q = other.table[tuple(values[i] for i in theirs)]
+            table[values] = p / q if q else 0.0
+        return Factor(self.variables, table)
+
+
+def multiply(factors):
+    """
+    Return the product of a list of factors, up to a constant: the
+    product is scaled to sum to 1 after each factor, since a person with
+    hundreds of children would otherwise underflow to 0.
+    """
+    product = Factor((), {(): 1})
+    for factor in factors:
+        product = product.multiply(factor)
+        scale(product)
+    return product
+
+
+def scale(factor):
+    """
+    Divide the numbers of `factor` by their total, in place.
+    A factor of all zeros is left as it is.
+    """
+    total = sum(factor.table.values())
+    if total == 0:
+        return
+    for values in factor.table:
+        factor.table[values] /= total
+
+
+def inherit(genes, probs):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes one on to a child.
+    """
+    mutation = probs["mutation"]
+    return {0: mutation, 1: 0.5, 2: 1 - mutation}[genes]
+
+
+def pedigree_factors(people, probs):
+    """
+    Return the list of factors of the Bayesian network for `people`, as
+    loaded by heredity.load_data, with probabilities `probs`.
+
+    Each person has a factor for their number of genes: unconditional for
+    people with no parents listed, and given both parents' genes
+    otherwise. People with a known trait have one more factor, the
+    probability of that trait given their genes. Unknown traits add
+    nothing, since they sum to 1 over both values.
+    """
+    return gene_factors(people, probs) + list(
+        trait_factors(people, probs).values())
+
+
+def gene_factors(people, probs):
+    """
+    Return the list of factors for each person's number of genes.
+    """
+    factors = []
+    for person, data in people.items():
+        mother, father = data["mother"], data["father"]
+        if mother is None:
+            table = {(g,): probs["gene"][g] for g in GENES}
+            factors.append(Factor((person,), table))
+            continue
+        table = dict()
+        for g, m, f in itertools.product(GENES, repeat=3):
+            from_mother = inherit(m, probs)
+            from_father = inherit(f, probs)
+            table[g, m, f] = (
+                from_mother * from_father if g == 2 else
+                from_mother * (1 - from_father) +
+                (1 - from_mother) * from_father if g == 1 else
+                (1 - from_mother) * (1 - from_father)
+            )
+        factors.append(Factor((person, mother, father), table))
+    return factors
+
+
+def trait_factors(people, probs):
+    """
+    Return a dictionary mapping each person with a known trait to a factor
+    over their genes: the probability of that trait given their genes.
+    """
+    return {
+        person: Factor((person,), {
+            (g,): probs["trait"][g][data["trait"]] for g in GENES
+        })
+        for person, data in people.items() if data["trait"] is not None
+    }
+
+
+def interaction_graph(factors):
+    """
+    Return a dictionary mapping each variable to the set of variables it
+    shares a factor with.
+    """
+    neighbors = dict()
+    for factor in factors:
+        for v in factor.variables:
+            neighbors.setdefault(v, set()).update(factor.variables)
+            neighbors[v].discard(v)
+    return neighbors
+
+
+def triangulate(factors):
+    """
+    Return a tuple (order, cliques): an order to eliminate the variables
+    of `factors` in, and for each variable in it, the set of that
+    variable and its neighbors when it is eliminated.
+
+    The order is chosen greedily: each time, the variable whose
+    elimination adds the fewest new links between its neighbors, then
+    the one with fewest neighbors, then by name. For pedigrees without
+    loops nothing is ever added, so no clique spans more than three
+    people.
+    """
+    neighbors = interaction_graph(factors)
+
+    def shared(first, second):
+        """Number of variables in both sets, looking through the smaller."""
+        if len(first) > len(second):
+            first, second = second, first
+        return sum(1 for c in first if c in second)
+
+    def rescore(u):
+        scores[u] = (fills[u], len(neighbors[u]))
+        heapq.heappush(heap, (scores[u], u))
+
+    # fill counts are kept up to date as links change, rather than counted
+    # again, which would take time quadratic in the number of children of
+    # a parent on every step; each link between two neighbors of v is
+    # counted from both ends
+    fills = dict()
+    for v, around in neighbors.items():
+        linked = sum(shared(neighbors[u], around) for u in around) // 2
+        fills[v] = len(around) * (len(around) - 1) // 2 - linked
+    scores = {v: (fills[v], len(neighbors[v])) for v in neighbors}
+    heap = [(score, v) for v, score in scores.items()]
+    heapq.heapify(heap)
+    order = []
+    cliques = []
+    while heap:
+        score, v = heapq.heappop(heap)
+        if v not in scores or scores[v] != score:
+            # stale entry, from before the score last changed
+            continue
+        order.append(v)
+        del scores[v]
+        del fills[v]
+        around = neighbors.pop(v)
+        cliques.append(around | {v})
+
+        # v leaves each neighbor a, taking the pairs it made with a's
+        # other neighbors, unlinked for those that are not v's neighbors
+        for a in around:
+            neighbors[a].discard(v)
+            fills[a] -= len(neighbors[a]) - shared(neighbors[a], around)
+
+        # link v's neighbors to each other: a new link (a, b) closes a
+        # pair for each neighbor they share, and opens a pair for a with
+        # each neighbor of a's that b is not linked to (and the same for b)
+        for a, b in itertools.combinations(sorted(around), 2):
+            if b in neighbors[a]:
+                continue
+            both = shared(neighbors[a], neighbors[b])
+            fills[a] += len(neighbors[a]) - both
+            fills[b] += len(neighbors[b]) - both
+            for c in neighbors[a] & neighbors[b]:
+                fills[c] -= 1
+                rescore(c)
+            neighbors[a].add(b)
+            neighbors[b].add(a)
+
+        for a in around:
+            rescore(a)
+    return order, cliques
+
+
+def eliminate(factors, order):
+    """
+    Sum the variables of `factors` out one at a time, in `order`, keeping
+    each step so that messages can be passed back down afterwards.
+
+    Return a tuple (buckets, parents, upward), with one entry per step i:
+    the product of the factors that mention order[i] when it is
+    eliminated, the step that the product with order[i] summed out goes
+    on to (the first of its variables eliminated), or None if it has no
+    variables left, and that message itself. Messages are scaled to sum
+    to 1, or large families would underflow to 0.
+    """
+    position = {v: i for i, v in enumerate(order)}
+    waiting = [[] for _ in order]
+    for factor in factors:
+        waiting[min(position[v] for v in factor.variables)].append(factor)
+
+    buckets, parents, upward = [], [], []
+    for i, variable in enumerate(order):
+        bucket = multiply(waiting[i])
+        message = bucket.sum_out(variable)
+        scale(message)
+        parent = None
+        if message.variables:
+            parent = min(position[v] for v in message.variables)
+            waiting[parent].append(message)
+        buckets.append(bucket)
+        parents.append(parent)
+        upward.append(message)
+    return buckets, parents, upward
+
+
+def distribute(buckets, parents, upward):
+    """
+    Pass messages back down from the last step of elimination to the
+    first, and return each step's bucket times everything the rest of the
+    network says about its variables, up to a constant.
+
+    Each step's parent, once done, sends it its own product summed down to
+    the step's message variables, divided by that message, so that the
+    step's own contribution is not counted twice.
+    """
+    beliefs = list(buckets)
+    for i in reversed(range(len(beliefs))):
+        parent = parents[i]
+        if parent is not None:
+            downward = beliefs[parent].project(upward[i].variables)
+            downward = downward.divide(upward[i])
+            scale(downward)
+            beliefs[i] = beliefs[i].multiply(downward)
+    return beliefs
+
+
+def distributions(gene, trait, probs):
+    """
+    Return a person's gene and trait distributions, in the form heredity
+    prints them, from their gene distribution `gene` and their known
+    `trait`, or None if it is unknown.
+    """
+    gene = {g: gene[g] for g in (2, 1, 0)}
+    if trait is None:
+        trait = {
+            value: sum(gene[g] * probs["trait"][g][value] for g in GENES)
+            for value in [True, False]
+        }
+    else:
+        trait = {True: float(trait), False: float(not trait)}
+    return {"gene": gene, "trait": trait}
+
+
+def marginals(people, probs):
+    """
+    Return each person's gene and trait distributions given the known
+    traits, in the same form as the `probabilities` of heredity.main,
+    by variable elimination.
+
+    Every variable is eliminated once, and the messages of that pass are
+    kept and sent back down, which leaves each person's step with their
+    distribution given all of the evidence. For pedigrees without loops
+    every step spans at most three people, so finding every person's
+    distribution takes time linear in the size of the family.
+    """
+    factors = pedigree_factors(people, probs)
+    order, _ = triangulate(factors)
+    position = {v: i for i, v in enumerate(order)}
+    beliefs = distribute(*eliminate(factors, order))
+    probabilities = dict()
+    for person in people:
+        belief = beliefs[position[person]].project((person,))
+        scale(belief)
+        gene = {g: belief.table[(g,)] for g in GENES}
+        probabilities[person] = distributions(
+            gene, people[person]["trait"], probs)
+    return probabilities
+
+
+class JunctionTree():
+    """
+    Clique tree of a family's Bayesian network, compiled once for its
+    structure (who is whose parent) and calibrated for any known traits.
+
+    The network's interaction graph is triangulated by min-fill
+    elimination, and each variable's clique is itself and its neighbors
+    when it is eliminated. A clique is joined to the clique of the first
+    variable eliminated after it among the rest of its members, which
+    makes a tree (one per unconnected group of people) in which each
+    person's cliques are connected. Unlike elimination order, loops such
+    as cousin marriages only make some cliques larger.
+    """
+
+    def __init__(self, people, probs):
+        self.probs = probs
+        factors = gene_factors(people, probs)
+        self.order, cliques = triangulate(factors)
+        self.position = {v: i for i, v in enumerate(self.order)}
+        self.variables = [
+            (v,) + tuple(sorted(clique - {v}, key=self.position.get))
+            for v, clique in zip(self.order, cliques)
+        ]
+        self.parents = [
+            self.position[variables[1]] if len(variables) > 1 else None
+            for variables in self.variables
+        ]
+
+        # each factor goes to the clique of its first variable eliminated,
+        # which holds all of its variables
+        self.potentials = [
+            Factor(variables, dict.fromkeys(
+                itertools.product(GENES, repeat=len(variables)), 1.0))
+            for variables in self.variables
+        ]
+        for factor in factors:
+            i = min(self.position[v] for v in factor.variables)
+            self.potentials[i] = self.potentials[i].multiply(factor)
+
+    def calibrate(self, people):
+        """
+        Return each person's gene and trait distributions given the known
+        traits in `people`, which must have the structure the tree was
+        compiled for, by passing messages up the tree and back down.
+        """
+        evidence = trait_factors(people, self.probs)
+        beliefs = list(self.potentials)
+        for person, factor in evidence.items():
+            i = self.position[person]
+            beliefs[i] = beliefs[i].multiply(factor)
+
+        # up: each clique, once its children are done, sums out its own
+        # variable and sends the rest to its parent, which comes later
+        upward = [None] * len(beliefs)
+        for i, parent in enumerate(self.parents):
+            if parent is not None:
+                upward[i] = beliefs[i].sum_out(self.order[i])
+                scale(upward[i])
+                beliefs[parent] = beliefs[parent].multiply(upward[i])
+                # keep a parent of many children from underflowing to 0
+                scale(beliefs[parent])
+
+        # down: each parent, now calibrated, sends back what it knows
+        # without its child's own message
+        beliefs = distribute(beliefs, self.parents, upward)
+
+        probabilities = dict()
+        for person in people:
+            belief = beliefs[self.position[person]].project((person,))
+            scale(belief)
+            gene = {g: belief.table[(g,)] for g in GENES}
+            probabilities[person] = distributions(
+                gene, people[person]["trait"], self.probs)
+        return probabilities
+
+
+# Compiled trees, by family structure
+_trees = dict()
+
+
+def structure(people):
+    """
+    Return a hashable description of who is whose parent in `people`.
+    """
+    return tuple(sorted(
+        (person, data["mother"] or "", data["father"] or "")
+        for person, data in people.items()
+    ))
+
+
+def junction_tree(people, probs):
+    """
+    Return the JunctionTree for the structure of `people`, compiling it
+    only if it has not been compiled with the same `probs` before.
+    """
+    key = structure(people)
+    tree = _trees.get(key)
+    if tree is None or tree.probs != probs:
+        tree = _trees[key] = JunctionTree(people, probs)
+    return tree
@@ -1,4 +1,7 @@
+import time
+
 import heredity
+import inference
 
 
 def test(function_name, test_arguments, expected = None):
@@ -20,4 +23,83 @@ test(
         {"James"},
         {"James"}
     ],
-)
\ No newline at end of file
+)
+
+def rounded(probabilities):
+    return {
+        person: {
+            field: {value: round(p, 4) for value, p in dist.items()}
+            for field, dist in fields.items()
+        }
+        for person, fields in probabilities.items()
+    }
+
+
+FAMILIES = [f"data/family{i}.csv" for i in range(4)]
+
+print("___inference.marginals")
+same = True
+for filename in FAMILIES:
+    people = heredity.load_data(filename)
+    result = rounded(inference.marginals(people, heredity.PROBS))
+    print(result)
+    same = same and result == rounded(heredity.enumerate_probabilities(people))
+print("* pass" if same else "! fail")
+print()
+
+print("___inference.JunctionTree")
+same = True
+for filename in FAMILIES:
+    people = heredity.load_data(filename)
+    tree = inference.junction_tree(people, heredity.PROBS)
+    result = rounded(tree.calibrate(people))
+    print(result)
+    same = same and result == rounded(heredity.enumerate_probabilities(people))
+
+# new traits for the same family reuse the compiled tree
+people["Ron"]["trait"] = True
+people["Hugo"]["trait"] = None
+reused = inference.junction_tree(people, heredity.PROBS) is tree
+same = same and reused and rounded(tree.calibrate(people)) == rounded(
+    inference.marginals(people, heredity.PROBS))
+print("* pass" if same else "! fail")
+print()
+
+
+def sibship(children, mothers=1):
+    """
+    Return a family of `children` with one father, and the children
+    shared out among `mothers` mothers, some with known traits.
+    """
+    people = {"Dad": {"name": "Dad", "mother": None, "father": None,
+                      "trait": True}}
+    for i in range(mothers):
+        people[f"Mum{i}"] = {"name": f"Mum{i}", "mother": None,
+                             "father": None, "trait": False}
+    for i in range(children):
+        people[f"Child{i}"] = {"name": f"Child{i}",
+                               "mother": f"Mum{i % mothers}", "father": "Dad",
+                               "trait": i % 3 == 0 if i % 2 else None}
+    return people
+
+
+print("___inference on wide sibships")
+# small enough to check against enumeration
+people = sibship(5, mothers=2)
+same = rounded(inference.marginals(people, heredity.PROBS)) == rounded(
+    heredity.enumerate_probabilities(people))
+# hundreds of full and half siblings, which must neither underflow nor
+# slow down more than in proportion to their number
+for children, mothers in [(800, 1), (1600, 1), (400, 400), (800, 800)]:
+    people = sibship(children, mothers)
+    start = time.perf_counter()
+    eliminated = inference.marginals(people, heredity.PROBS)
+    calibrated = inference.junction_tree(people, heredity.PROBS).calibrate(
+        people)
+    seconds = time.perf_counter() - start
+    print(f"{len(people)} people, {mothers} mothers: {seconds:.2f} s")
+    same = same and rounded(eliminated) == rounded(calibrated) and all(
+        abs(sum(dist.values()) - 1) < 1e-9
+        for fields in eliminated.values() for dist in fields.values())
+print("* pass" if same else "! fail")
+print()